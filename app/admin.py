@@ -4,6 +4,7 @@ from .models import *
 admin.site.register(GlyphSet)
 admin.site.register(Glyph)
 admin.site.register(Language)
+admin.site.register(LanguageStats)
 admin.site.register(Orthography)
 admin.site.register(WordClass)
 admin.site.register(Word)
@@ -11,6 +12,9 @@ admin.site.register(Accent)
 admin.site.register(InflectionClass)
 admin.site.register(InflectionTag)
 admin.site.register(Inflection)
+admin.site.register(ParadigmRule)
 admin.site.register(ObjectTag)
 admin.site.register(Entry)
 admin.site.register(ExampleSentence)
+admin.site.register(AppliedPreset)
+admin.site.register(WordCard)
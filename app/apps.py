@@ -1,12 +1,21 @@
+import logging
+from time import monotonic
+
+from asgiref.sync import sync_to_async
 from django.apps import AppConfig as Config
 from django.conf import settings
+from django.core.cache import cache
 from django.db import DatabaseError
-from watson import search as watson
+from django.db.models.signals import post_migrate
+
+logger = logging.getLogger(__name__)
 
 
 class AppConfig(Config):
     default_auto_field = 'django.db.models.BigAutoField'
     application = None
+    application_expires = 0
+    application_key = 'app:application'
     verbose_name = 'dictionary'
     name = 'app'
 
@@ -14,21 +23,75 @@ class AppConfig(Config):
     node_dir = base_dir / 'jstoolchains'
 
     def ready(self):
-        self.update()
         self.register_search_index()
+        self.connect_signals()
+
+    @staticmethod
+    def get_application():
+        """
+        Return the application instance, or None if it is not set up yet.
+
+        The status is kept in process for APPLICATION_STATE_TTL seconds, so
+        this is free in steady state.
+        """
+        if monotonic() >= AppConfig.application_expires:
+            AppConfig.update()
+        return AppConfig.application
+
+    @staticmethod
+    async def get_application_async():
+        """
+        Async counterpart of get_application(), which only leaves the event
+        loop to refresh an expired status.
+        """
+        if monotonic() >= AppConfig.application_expires:
+            await sync_to_async(AppConfig.update)()
+        return AppConfig.application
 
     @staticmethod
     def update():
         """
         Update application status
+
+        The status is shared across processes through the cache, so only a
+        cache miss queries the database. A missing application is cached
+        as well, which keeps nodes that are not set up from querying it on
+        every request.
+
+        A failed query is not shared: this process keeps its last known
+        status until the next refresh, and other processes are unaffected.
         """
         from app.models import Application
-        try:
-            AppConfig.application = Application.objects.first()
-        except DatabaseError:
-            pass
+
+        application = cache.get(AppConfig.application_key)
+        if application is None:
+            try:
+                application = Application.objects.first() or False
+            except DatabaseError as ex:
+                logger.warning('Failed querying application status: %s', ex)
+                AppConfig.set_application(AppConfig.application, share=False)
+                return
+            cache.set(AppConfig.application_key, application, settings.APPLICATION_STATE_TTL)
+
+        AppConfig.set_application(application or None, share=False)
+
+    @staticmethod
+    def set_application(application, share=True):
+        """
+        Set application status, sharing it with other processes by default.
+        """
+        if share:
+            cache.set(AppConfig.application_key, application or False, settings.APPLICATION_STATE_TTL)
+        AppConfig.application = application
+        AppConfig.application_expires = monotonic() + settings.APPLICATION_STATE_TTL
+
+    @staticmethod
+    def connect_signals():
+        from app import signals  # noqa: F401
 
     def register_search_index(self):
-        watson.register(self.get_model('Word'), fields=('transcript', 'entries__paraphrase'))
-        watson.register(self.get_model('Entry'), fields=('paraphrase',))
-        watson.register(self.get_model('ExampleSentence'), fields=('transcript',))
+        from app.services import fts
+        fts.register(self.get_model('Word'), 'search_key')
+        fts.register(self.get_model('Entry'), 'search_key')
+        fts.register(self.get_model('ExampleSentence'), 'search_key')
+        post_migrate.connect(fts.post_migrate_handler, sender=self)
@@ -0,0 +1,81 @@
+"""
+Synthetic lexicons for benchmarks.
+
+Words are pronounceable strings of syllables, and text is drawn from a
+seeded random generator, so a given configuration always produces the
+same data.
+"""
+from random import Random
+
+from django.db import DEFAULT_DB_ALIAS
+
+from app.services.formats import record
+from app.services.importer import DictionaryImporter
+
+SYLLABLES = [onset + vowel for onset in ('', 'b', 'd', 'f', 'g', 'k', 'l', 'm', 'n', 'p', 'r', 's', 't', 'v', 'z')
+             for vowel in 'aeiou']
+WORD_CLASSES = (('Noun', 'n'), ('Verb', 'v'), ('Adjective', 'adj'), ('Adverb', 'adv'))
+
+
+# Every syllable ends with its only vowel, so distinct syllable sequences
+# spell distinct words.
+WORD_SYLLABLES = 4
+WORD_SPACE = len(SYLLABLES) ** WORD_SYLLABLES
+STRIDE = 15485863  # prime, so coprime with WORD_SPACE
+
+
+def pseudo_word(rng, syllables=(2, 4)):
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(*syllables)))
+
+
+def headword(index, seed=0):
+    """
+    Return the index-th headword: a bijection from indexes to words of
+    WORD_SYLLABLES syllables, scrambled so neighbours look unrelated.
+    """
+    number = (index * STRIDE + seed) % WORD_SPACE
+    syllables = []
+    for _ in range(WORD_SYLLABLES):
+        number, digit = divmod(number, len(SYLLABLES))
+        syllables.append(SYLLABLES[digit])
+    return ''.join(syllables)
+
+
+def sentence(rng, length=(4, 10)):
+    return ' '.join(pseudo_word(rng, (1, 3)) for _ in range(rng.randint(*length))).capitalize()
+
+
+def records(language, words, entries=2, examples=1, tags=20, seed=0):
+    """
+    Yield `words` word records, each with `entries` entries, each entry
+    having `examples` example sentences and one of `tags` tags.
+    """
+    if words > WORD_SPACE:
+        raise ValueError('At most %s words can be generated.' % WORD_SPACE)
+
+    rng = Random(seed)
+    tag_names = ['%s tag %s' % (language, index) for index in range(tags)]
+
+    for index in range(words):
+        transcript = headword(index, seed)
+        yield record(language, transcript, accents=[transcript], entries=[
+            {
+                'class': word_class,
+                'abbr': abbr,
+                'paraphrase': sentence(rng),
+                'tags': [rng.choice(tag_names)] if tag_names else [],
+                'examples': [{'transcript': sentence(rng)} for _ in range(examples)],
+            } for word_class, abbr in (rng.choice(WORD_CLASSES) for _ in range(entries))
+        ])
+
+
+def generate(language, words, entries=2, examples=1, tags=20, seed=0, batch_size=5000, using=DEFAULT_DB_ALIAS):
+    """
+    Load a synthetic language through the bulk importer.
+
+    Return the importer counts.
+    """
+    importer = DictionaryImporter(batch_size, using)
+    for _ in importer.run(records(language, words, entries, examples, tags, seed)):
+        pass
+    return importer.counts
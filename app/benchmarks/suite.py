@@ -0,0 +1,235 @@
+"""
+Benchmarks of the hot paths, timed under the Django test client.
+
+Each benchmark runs a number of times over a generated lexicon; results
+are summarized as milliseconds per run and stored as JSON, so runs from
+different commits can be compared.
+"""
+import json
+import platform
+import subprocess
+from random import Random
+from statistics import median
+from time import perf_counter
+
+import django
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.template import engines
+from django.template.loader import render_to_string
+from django.test import Client
+from django.utils.timezone import now
+
+from app.benchmarks.generator import WORD_CLASSES, generate, headword, pseudo_word
+from app.models import Application, InflectionClass, InflectionTag, Language, ParadigmRule, WordClass
+from app.services import cards
+from app.services.exporter import export_words
+from app.services.paradigms import ParadigmGenerator, paradigms
+
+benchmarks = {}
+
+
+def benchmark(function):
+    benchmarks[function.__name__] = function
+    return function
+
+
+class Context:
+    def __init__(self, language, words, seed=0):
+        self.language = language
+        self.words = words
+        self.rng = Random(seed)
+        self.client = Client()
+
+    def sample_word(self):
+        return headword(self.rng.randrange(self.words))
+
+
+@benchmark
+def search(context):
+    word = context.sample_word()
+    return lambda: context.client.get('/search', {'w': word[:context.rng.randint(3, len(word))]})
+
+
+@benchmark
+def word_page(context):
+    word = context.sample_word()
+    caches[settings.WORD_PAGE_CACHE].clear()
+    return lambda: context.client.get('/word/%s' % word)
+
+
+@benchmark
+def word_page_cached(context):
+    word = context.sample_word()
+    context.client.get('/word/%s' % word)
+    return lambda: context.client.get('/word/%s' % word)
+
+
+@benchmark
+def word_template(context):
+    card = cards.get_card(context.sample_word())
+    return lambda: render_to_string('widgets/word_snippet.html', {'word': card})
+
+
+TELEPORTS = (
+    "{% teleport items|length > 0 ? 'right_side' %}"
+    "{% for item in items %}<li><a href=\"#{{ item }}\">{{ item }}</a></li>{% endfor %}"
+    "{% endteleport %}"
+)
+
+
+@benchmark
+def teleport(context):
+    page = engines['django'].from_string(
+        '{% load teleport %}' + TELEPORTS * 100 + "{% portal 'right_side' %}"
+    )
+    items = [context.sample_word() for _ in range(20)]
+    return lambda: page.render({'items': items})
+
+
+@benchmark
+def bulk_import(context):
+    language = 'Benchmark import %s' % context.rng.random()
+    return lambda: generate(language, 1000)
+
+
+@benchmark
+def export(context):
+    return lambda: sum(1 for _ in export_words(context.language))
+
+
+SUFFIXES = ('j', 'n', 'jn')
+
+
+def paradigm(language):
+    """
+    Return an inflection class of all generated word classes, with plural
+    and accusative suffixes for the language, creating it once.
+    """
+    inflection_class, created = InflectionClass.objects.get_or_create(name='Benchmark', defaults={'note': ''})
+    if created:
+        inflection_class.range.set(WordClass.objects.filter(name__in=[name for name, _ in WORD_CLASSES]))
+        plural, accusative = [
+            InflectionTag.objects.create(clss=inflection_class, name=name, note='') for name in ('Plural', 'Accusative')
+        ]
+        for tags, order in (([plural], 0), ([accusative], 1), ([plural, accusative], 2)):
+            ParadigmRule.objects.create(clss=inflection_class, language=language, order=order).tags.set(tags)
+    return inflection_class
+
+
+@benchmark
+def inflect(context):
+    # New suffixes on every run, so every word gets its forms rewritten.
+    inflection_class = paradigm(context.language)
+    variant = pseudo_word(context.rng, (1, 1))
+    for rule, suffix in zip(inflection_class.rules.all(), SUFFIXES):
+        rule.value = suffix + variant
+        rule.save()
+
+    def run():
+        for _ in ParadigmGenerator(5000).run(paradigms([inflection_class.name])):
+            pass
+    return run
+
+
+def measure(name, context, repeat):
+    """
+    Run a benchmark `repeat` times, each after its untimed setup, and
+    return run times in milliseconds.
+    """
+    times = []
+    for _ in range(repeat):
+        run = benchmarks[name](context)
+        started = perf_counter()
+        run()
+        times.append((perf_counter() - started) * 1000)
+    return times
+
+
+def summarize(times):
+    ordered = sorted(times)
+    return {
+        'runs': len(ordered),
+        'min': ordered[0],
+        'median': median(ordered),
+        'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        'max': ordered[-1],
+    }
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(words, entries=2, examples=1, tags=20, repeat=20, names=None, seed=0, report=None):
+    """
+    Generate a lexicon (unless it exists already) and run the benchmarks.
+
+    Return the results, ready to be dumped as JSON.
+    """
+    Application.objects.get_or_create(defaults={'name': 'benchmark'})
+    name = 'Benchmark %s-%s-%s-%s-%s' % (words, entries, examples, tags, seed)
+    generated = {}
+
+    if not Language.objects.filter(name=name).exists():
+        started = perf_counter()
+        generated = dict(generate(name, words, entries, examples, tags, seed))
+        call_command('rebuild_word_cards', verbosity=0)
+        generated['seconds'] = perf_counter() - started
+
+    context = Context(Language.objects.get(name=name), words, seed)
+    results = {}
+    for benchmark_name in names or benchmarks:
+        if report is not None:
+            report(benchmark_name)
+        results[benchmark_name] = summarize(measure(benchmark_name, context, repeat))
+
+    return {
+        'commit': commit(),
+        'date': now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+        },
+        'lexicon': {'words': words, 'entries': entries, 'examples': examples, 'tags': tags, 'seed': seed},
+        'generated': generated,
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold=0.1):
+    """
+    Compare median times of two runs.
+
+    Return (name, baseline ms, current ms, change) for every benchmark of
+    both runs, and the names of those slower by more than `threshold`.
+    """
+    rows, regressions = [], []
+    for name, result in current['results'].items():
+        if name not in baseline['results']:
+            continue
+        before, after = baseline['results'][name]['median'], result['median']
+        change = (after - before) / before if before else 0.0
+        rows.append((name, before, after, change))
+        if change > threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+def load(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def dump(results, path):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2)
+        file.write('\n')
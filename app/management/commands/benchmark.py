@@ -0,0 +1,90 @@
+from django.conf import settings
+from django.core.management import CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from app.benchmarks import suite
+from app.management.base import VerboseCommand
+
+
+class Command(VerboseCommand):
+    help = 'Benchmark search, word pages, templates, import, export and inflection on a synthetic lexicon'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+    def add_arguments(self, parser):
+        parser.add_argument('--words', type=int, default=10000, help='Number of words generated.')
+        parser.add_argument('--entries', type=int, default=2, help='Number of entries per word.')
+        parser.add_argument('--examples', type=int, default=1, help='Number of example sentences per entry.')
+        parser.add_argument('--tags', type=int, default=20, help='Number of distinct entry tags.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the generated lexicon.')
+        parser.add_argument('--repeat', type=int, default=20, help='Number of runs of each benchmark.')
+        parser.add_argument(
+            '-b', '--benchmark', action='append', choices=list(suite.benchmarks), dest='benchmarks',
+            help='Benchmark to run. May be given several times. Defaults to all.'
+        )
+        parser.add_argument('-o', '--output', help='File the results are written to, as JSON.')
+        parser.add_argument(
+            '--compare', metavar='BASELINE',
+            help='Results file of an earlier run. Fail if a benchmark got slower than the threshold.'
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=0.1,
+            help='Tolerated slowdown of median times when comparing, as a fraction. Defaults to 0.1.'
+        )
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Keep the benchmark database, so the lexicon is generated only once.'
+        )
+
+    def keep_test_db(self):
+        """
+        SQLite test databases live in memory unless named, and would be gone
+        with the connection; keep the lexicon in a file instead.
+        """
+        test = connection.settings_dict.setdefault('TEST', {})
+        if connection.vendor == 'sqlite' and connection.creation.is_in_memory_db(test.get('NAME') or ':memory:'):
+            test['NAME'] = str(settings.BASE_DIR / 'benchmark.sqlite3')
+            self.print('Keeping the benchmark database in %s.' % test['NAME'], level=2)
+
+    def handle(self, *args, **options):
+        baseline = suite.load(options['compare']) if options['compare'] else None
+
+        # Benchmarks run against a test database, never the real one, and
+        # without view budgets, whose warnings would flood the output.
+        setup_test_environment()
+        budgets = override_settings(VIEW_BUDGETS={})
+        budgets.enable()
+        if options['keepdb']:
+            self.keep_test_db()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            self.print('Benchmarking with %s word(s)...' % options['words'])
+            results = suite.run(
+                options['words'], options['entries'], options['examples'], options['tags'],
+                options['repeat'], options['benchmarks'], options['seed'],
+                report=lambda name: self.print('Running %s...' % name, level=2),
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            budgets.disable()
+            teardown_test_environment()
+
+        if results['generated']:
+            self.print('Generated the lexicon in %.1fs.' % results['generated']['seconds'])
+        for name, result in results['results'].items():
+            self.print('%-18s median %8.2fms  p95 %8.2fms' % (name, result['median'], result['p95']))
+
+        if options['output']:
+            suite.dump(results, options['output'])
+            self.print(self.style.SUCCESS('Results written to %s.' % options['output']))
+
+        if baseline is not None:
+            rows, regressions = suite.compare(baseline, results, options['threshold'])
+            self.print('\nCompared with %s:' % (baseline.get('commit') or options['compare']))
+            for name, before, after, change in rows:
+                style = self.style.ERROR if name in regressions else self.style.SUCCESS
+                self.print(style('%-18s %8.2fms -> %8.2fms (%+.0f%%)' % (name, before, after, change * 100)))
+            if regressions:
+                raise CommandError('%s benchmark(s) regressed: %s.' % (len(regressions), ', '.join(regressions)))
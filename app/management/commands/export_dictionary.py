@@ -0,0 +1,69 @@
+from django.core.management import CommandError
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+from django.utils.timezone import now
+
+from app.management.base import VerboseCommand
+from app.models import Language
+from app.services.exporter import export_words, watermark
+from app.services.formats import FORMATS, writers
+
+
+class Command(VerboseCommand):
+    help = "Export a language's words as JSONL, CSV or TEI Lex-0"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+    def add_arguments(self, parser):
+        parser.add_argument('language', help='Name of the language to export.')
+        parser.add_argument(
+            '-f', '--format', choices=FORMATS, default='jsonl',
+            help='Output format. Defaults to JSONL.'
+        )
+        parser.add_argument(
+            '-o', '--output',
+            help='File to write to. Defaults to the standard output.'
+        )
+        parser.add_argument(
+            '--since', type=watermark,
+            help='Only export words modified since this ISO 8601 date or time, for incremental dumps.'
+        )
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Database to export from. Defaults to the "default" database.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Number of words loaded per query.'
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        try:
+            language = Language.objects.using(using).get(name=options['language'])
+        except Language.DoesNotExist:
+            raise CommandError("Language '%s' does not exist." % options['language'])
+
+        # Taken before reading, so that the next incremental dump starting
+        # from it includes words changed while this one runs.
+        started = now()
+        records = export_words(language, options['since'], options['chunk_size'], using)
+        chunks = writers[options['format']](records, language.name)
+
+        try:
+            if options['output']:
+                with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                    output.writelines(chunks)
+            else:
+                for chunk in chunks:
+                    self.stdout.write(chunk, ending='')
+        except (OSError, DatabaseError) as ex:
+            self.print_error(self.style.ERROR('ERROR: Failed exporting %s: %s' % (language, ex)))
+            if options['traceback']:
+                raise ex
+            return
+
+        # Status goes to stderr when the dump itself is written to stdout.
+        report = self.print if options['output'] else self.print_error
+        report(self.style.SUCCESS('Exported %s.' % language))
+        report('Next incremental export: --since %s' % started.isoformat(), level=2)
@@ -0,0 +1,48 @@
+from time import monotonic
+
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+
+from app.management.base import VerboseCommand
+from app.services.paradigms import ParadigmError, ParadigmGenerator, paradigms
+
+
+class Command(VerboseCommand):
+    help = 'Generate inflections of words from the paradigm rules of inflection classes'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'classes', nargs='*', metavar='class',
+            help='Names of the inflection classes to generate. Defaults to all classes having rules.'
+        )
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Database to generate inflections on. Defaults to the "default" database.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of words inflected per transaction.'
+        )
+
+    def handle(self, *args, **options):
+        generator = ParadigmGenerator(options['batch_size'], options['database'])
+        started = monotonic()
+
+        try:
+            for paradigm in paradigms(options['classes'] or None, options['database']):
+                self.print('Generating %s...' % paradigm)
+                for counts in generator.run([paradigm]):
+                    self.print('%s: %s word(s) inflected...' % (paradigm, counts['words']), level=2)
+        except (ParadigmError, DatabaseError) as ex:
+            self.print_error(self.style.ERROR('ERROR: Failed generating inflections: %s' % ex))
+            if options['traceback']:
+                raise ex
+            return
+
+        counts = generator.counts
+        self.print('Removed %s outdated inflection(s).' % counts['removed'], level=2)
+        self.print(self.style.SUCCESS('Generated %s inflection(s) of %s word(s) in %.1fs.' % (
+            counts['inflections'], counts['words'], monotonic() - started
+        )))
@@ -0,0 +1,70 @@
+from time import monotonic
+
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+
+from app.management.base import VerboseCommand
+from app.services.formats import FORMATS, FormatError, guess_format, readers
+from app.services.importer import DictionaryImporter
+
+
+class Command(VerboseCommand):
+    help = 'Import words from JSONL, CSV or TEI Lex-0 dictionary files'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+', help='Dictionary files to import.')
+        parser.add_argument(
+            '-f', '--format', choices=FORMATS,
+            help='Format of the files. Guessed from their extensions by default.'
+        )
+        parser.add_argument(
+            '-l', '--language',
+            help='Language of the words, for files which do not name it.'
+        )
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Database to import into. Defaults to the "default" database.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of words imported per transaction.'
+        )
+
+    def import_file(self, importer, path, file_format, language):
+        reader = readers.get(file_format)
+        if reader is None:
+            raise FormatError("Unknown format '%s'." % file_format)
+
+        if file_format == 'tei':
+            stream = open(path, 'rb')
+        else:
+            stream = open(path, encoding='utf-8', newline='')
+
+        with stream:
+            for counts in importer.run(reader(stream, language)):
+                self.print('%s: %s record(s) read...' % (path, counts['records']), level=2)
+
+    def handle(self, *args, **options):
+        importer = DictionaryImporter(options['batch_size'], options['database'])
+        started = monotonic()
+
+        try:
+            for path in options['files']:
+                self.print('Importing %s...' % path)
+                self.import_file(importer, path, options['format'] or guess_format(path), options['language'])
+        except (OSError, FormatError, DatabaseError) as ex:
+            self.print_error(self.style.ERROR('ERROR: Failed importing %s: %s' % (path, ex)))
+            if options['traceback']:
+                raise ex
+            return
+
+        elapsed = monotonic() - started
+        counts = importer.counts
+        for name, count in sorted(counts.items()):
+            if name != 'records':
+                self.print('Created %s %s.' % (count, name), level=2)
+        self.print(self.style.SUCCESS('Imported %s record(s) in %.1fs (%d records/s).' % (
+            counts['records'], elapsed, counts['records'] / elapsed if elapsed else 0
+        )))
@@ -0,0 +1,68 @@
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, transaction
+
+from app.management.base import VerboseCommand
+from app.models import Language, Word, Inflection, Entry, ExampleSentence
+from app.services import fts
+
+
+class Command(VerboseCommand):
+    help = 'Recompute search keys and rebuild the full text search index from scratch'
+
+    sources = (
+        (Word, 'transcript', 'language_id'),
+        (Inflection, 'transcript', 'word__language_id'),
+        (Entry, 'paraphrase', 'word__language_id'),
+        (ExampleSentence, 'transcript', 'entry__word__language_id'),
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Database to rebuild the index on. Defaults to the "default" database.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help='Number of rows updated per query.'
+        )
+
+    def refresh_search_keys(self, using, batch_size):
+        languages = {lang.pk: lang for lang in Language.objects.using(using)}
+
+        for model, field, language in self.sources:
+            rows = model.objects.using(using).values_list('pk', field, language, 'search_key')
+            batch, updated = [], 0
+
+            for pk, text, language_id, search_key in rows.iterator(chunk_size=batch_size):
+                key = languages[language_id].fold(text)
+                if key != search_key:
+                    batch.append(model(pk=pk, search_key=key))
+                if len(batch) >= batch_size:
+                    updated += len(batch)
+                    model.objects.using(using).bulk_update(batch, ['search_key'])
+                    batch = []
+
+            updated += len(batch)
+            model.objects.using(using).bulk_update(batch, ['search_key'])
+            self.print('Updated %s search key(s) of %s.' % (updated, model._meta.verbose_name_plural), level=2)
+
+    def handle(self, *args, **options):
+        using = options['database']
+        try:
+            with transaction.atomic(using=using):
+                self.print('Recomputing search keys...')
+                self.refresh_search_keys(using, options['batch_size'])
+
+                self.print('Rebuilding search index...')
+                rebuilt = fts.rebuild(using)
+
+            if not rebuilt:
+                self.print(self.style.WARNING('Full text search is not supported by this database. Skipped.'))
+                return
+            self.print(self.style.SUCCESS('Search index rebuilt.'))
+        except DatabaseError as ex:
+            self.print_error(self.style.ERROR('ERROR: Failed rebuilding search index.'))
+            if options['traceback']:
+                raise ex
@@ -0,0 +1,43 @@
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+
+from app.management.base import VerboseCommand
+from app.models import Word
+from app.services import cards
+
+
+class Command(VerboseCommand):
+    help = 'Rebuild the precomputed cards rendered for words'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Database to rebuild cards on. Defaults to the "default" database.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of cards rebuilt at a time.'
+        )
+
+    def handle(self, *args, **options):
+        using, batch_size = options['database'], options['batch_size']
+        words = Word.objects.using(using).order_by('pk').values_list('pk', flat=True)
+        last, rebuilt = 0, 0
+
+        try:
+            while True:
+                pks = list(words.filter(pk__gt=last)[:batch_size])
+                if not pks:
+                    break
+                rebuilt += len(cards.refresh(pks, using))
+                last = pks[-1]
+                self.print('Rebuilt %s card(s)...' % rebuilt, level=2)
+        except DatabaseError as ex:
+            self.print_error(self.style.ERROR('ERROR: Failed rebuilding word cards.'))
+            if options['traceback']:
+                raise ex
+            return
+
+        self.print(self.style.SUCCESS('Rebuilt %s word card(s).' % rebuilt))
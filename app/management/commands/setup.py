@@ -13,7 +13,7 @@ class Command(QuestionCommand, RunProcessCommand):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.node_dir = AppConfig.node_dir
-        self.instance = AppConfig.application
+        self.instance = AppConfig.get_application()
 
     def handle_process(self, args, msg, error_msg, cwd=None):
         try:
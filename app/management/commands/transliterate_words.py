@@ -0,0 +1,69 @@
+from time import monotonic
+
+from django.core.management import CommandError
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+
+from app.management.base import VerboseCommand
+from app.models import GlyphSet, Language
+from app.services.transliteration import TransliterationError, UnicodeBackfill, language_glyph_set, transliterator
+
+
+class Command(VerboseCommand):
+    help = 'Fill the unicode texts of the words, inflections and sentences of a language from their transcripts'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'language',
+            help='Name of the language to transliterate.'
+        )
+        parser.add_argument(
+            '--glyph-set',
+            help="Name of the glyph set to transliterate into. Defaults to the one of the language's orthography."
+        )
+        parser.add_argument(
+            '--overwrite', action='store_true',
+            help='Transliterate rows which already have a unicode text as well.'
+        )
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Database to transliterate on. Defaults to the "default" database.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of rows transliterated per transaction.'
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        try:
+            language = Language.objects.using(using).get(name=options['language'])
+        except Language.DoesNotExist:
+            raise CommandError("Language '%s' does not exist." % options['language'])
+        try:
+            glyph_set = options['glyph_set'] and GlyphSet.objects.using(using).get(name=options['glyph_set'])
+        except GlyphSet.DoesNotExist:
+            raise CommandError("Glyph set '%s' does not exist." % options['glyph_set'])
+
+        started = monotonic()
+        try:
+            glyph_set = glyph_set or language_glyph_set(language, using)
+            backfill = UnicodeBackfill(
+                transliterator(glyph_set, using), options['overwrite'], options['batch_size'], using
+            )
+            self.print('Transliterating %s into %s...' % (language.name, glyph_set.name))
+            for counts in backfill.run(language):
+                self.print('%s row(s) transliterated...' % sum(counts.values()), level=2)
+        except (TransliterationError, DatabaseError) as ex:
+            self.print_error(self.style.ERROR('ERROR: Failed transliterating: %s' % ex))
+            if options['traceback']:
+                raise ex
+            return
+
+        for name, count in sorted(backfill.counts.items()):
+            self.print('Updated %s %s.' % (count, name), level=2)
+        self.print(self.style.SUCCESS('Transliterated %s row(s) in %.1fs.' % (
+            sum(backfill.counts.values()), monotonic() - started
+        )))
@@ -0,0 +1,44 @@
+import re
+
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import decorator_from_middleware
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+accepts_brotli = re.compile(r'\bbr\b')
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compress responses with Brotli if the client accepts it and the brotli
+    package is installed, and with gzip otherwise.
+    """
+
+    def process_response(self, request, response):
+        if (
+            brotli is None or response.streaming or response.has_header('Content-Encoding')
+            or len(response.content) < 200
+            or not accepts_brotli.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        ):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed = brotli.compress(response.content, quality=5)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        # The representation changed, so a strong ETag would be wrong.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = 'br'
+        return response
+
+
+compress_page = decorator_from_middleware(CompressionMiddleware)
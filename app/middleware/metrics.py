@@ -0,0 +1,87 @@
+import asyncio
+import logging
+
+from django.conf import settings
+
+from app.services.metrics import RequestMetrics, current, registry
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsMiddleware:
+    """
+    Record query count, database time, template time and total time of
+    every request, answer them in a Server-Timing header and add them to
+    the totals of the view for the /metrics endpoint.
+
+    Requests going over the budget of their view (see VIEW_BUDGETS in the
+    settings) are logged with the SQL they ran.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        metrics = RequestMetrics()
+        token = current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.process_response(request, response, metrics)
+
+    async def __acall__(self, request):
+        # Threads running sync code for this request inherit the context,
+        # so their queries are recorded too.
+        metrics = RequestMetrics()
+        token = current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.process_response(request, response, metrics)
+
+    def process_response(self, request, response, metrics):
+        metrics.finish()
+
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = metrics.server_timing()
+
+        match = request.resolver_match
+        if match is not None:
+            view = match.view_name
+            registry.record(view, metrics, self.check_budget(view, metrics))
+        return response
+
+    @staticmethod
+    def check_budget(view, metrics):
+        """
+        Log a warning if the request went over the budget of its view.
+
+        Return True if it did.
+        """
+        budget = settings.VIEW_BUDGETS.get(view)
+        if budget is None:
+            return False
+
+        exceeded = []
+        if len(metrics.queries) > budget.get('queries', float('inf')):
+            exceeded.append('%s queries (budget %s)' % (len(metrics.queries), budget['queries']))
+        if metrics.total * 1000 > budget.get('ms', float('inf')):
+            exceeded.append('%.1fms (budget %sms)' % (metrics.total * 1000, budget['ms']))
+        if not exceeded:
+            return False
+
+        logger.warning(
+            "View '%s' over budget: %s. SQL:\n%s", view, ', '.join(exceeded),
+            '\n'.join('[%.1fms] %s' % (duration * 1000, sql) for sql, duration in metrics.queries)
+        )
+        return True
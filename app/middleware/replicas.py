@@ -0,0 +1,62 @@
+import asyncio
+
+from django.conf import settings
+
+from app.services import replicas
+
+PIN_COOKIE = 'primary'
+
+
+class ReplicaMiddleware:
+    """
+    Route the reads of the views in REPLICA_VIEWS to a read replica.
+
+    Requests which may write, those after which the client is pinned to
+    the primary, and all requests while no replicas are configured read
+    from the primary.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+            self.process_view = self.process_view_async
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        with replicas.reads(self.pinned(request)) as state:
+            return self.process_response(request, self.get_response(request), state)
+
+    async def __acall__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return await self.get_response(request)
+        with replicas.reads(self.pinned(request)) as state:
+            return self.process_response(request, await self.get_response(request), state)
+
+    @staticmethod
+    def pinned(request):
+        return request.method not in ('GET', 'HEAD', 'OPTIONS') or PIN_COOKIE in request.COOKIES
+
+    def process_view(self, request, *_):
+        self.route(request)
+
+    async def process_view_async(self, request, *_):
+        self.route(request)
+
+    @staticmethod
+    def route(request):
+        state = replicas.current()
+        if state is not None and request.resolver_match.url_name in settings.REPLICA_VIEWS:
+            state.use_replica()
+
+    @staticmethod
+    def process_response(request, response, state):
+        if state.wrote:
+            # Read your writes: stay on the primary until replicas caught up.
+            response.set_cookie(PIN_COOKIE, '1', max_age=settings.REPLICA_LAG, httponly=True, samesite='Lax')
+        return response
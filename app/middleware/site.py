@@ -1,11 +1,22 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
 from django.template.response import TemplateResponse
 
 from app.apps import AppConfig
 
 
 class InstallationMiddleware:
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Served asynchronously: let the handler await this middleware,
+            # and check the status without a thread hop.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+            self.process_view = self.process_view_async
 
     def __call__(self, request):
         return self.get_response(request)
@@ -13,21 +24,23 @@ class InstallationMiddleware:
     def process_view(self, request, *_):
         # application status guard
         if self.guard():
-            return TemplateResponse(request, 'site/setup.html').render()
+            return self.setup_page(request)
+        return None
+
+    async def process_view_async(self, request, *_):
+        if await AppConfig.get_application_async() is None:
+            return await sync_to_async(self.setup_page)(request)
         return None
 
-    def guard(self, detected=False):
+    @staticmethod
+    def setup_page(request):
+        return TemplateResponse(request, 'site/setup.html').render()
+
+    @staticmethod
+    def guard():
         """
         Detect if application is available.
 
-        If the first attempt failed, call update() and detect it again.
-
         Return True if failed.
         """
-        failed = AppConfig.application is None
-
-        if failed and not detected:
-            AppConfig.update()
-            failed = self.guard(True)
-
-        return failed
+        return AppConfig.get_application() is None
@@ -0,0 +1,273 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Accent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ipa', models.CharField(max_length=256)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Application',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=256)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AppliedPreset',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=50, unique=True)),
+                ('version', models.PositiveIntegerField()),
+                ('checksum', models.CharField(max_length=64)),
+                ('applied', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Entry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('paraphrase', models.CharField(max_length=256)),
+                ('note', models.CharField(blank=True, max_length=256)),
+                ('search_key', models.CharField(db_index=True, editable=False, max_length=512)),
+            ],
+            options={
+                'verbose_name_plural': 'Entries',
+            },
+        ),
+        migrations.CreateModel(
+            name='ExampleSentence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transcript', models.CharField(max_length=500)),
+                ('unicode', models.CharField(blank=True, max_length=500)),
+                ('note', models.CharField(blank=True, max_length=500)),
+                ('search_key', models.CharField(db_index=True, editable=False, max_length=1000)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Font',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=256, unique=True)),
+                ('file', models.FilePathField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Glyph',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=256)),
+                ('transcript', models.CharField(blank=True, help_text='Latin spelling written with this glyph, e.g. "sh".', max_length=64)),
+                ('unicode', models.CharField(blank=True, help_text='Text of the glyph in its script.', max_length=64)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='GlyphSet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=256, unique=True)),
+                ('vertical', models.BooleanField(default=False)),
+                ('upward', models.BooleanField(default=False)),
+                ('right_to_left', models.BooleanField(default=False)),
+                ('description', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Inflection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transcript', models.CharField(max_length=256)),
+                ('unicode', models.CharField(blank=True, max_length=256)),
+                ('search_key', models.CharField(db_index=True, editable=False, max_length=512)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='InflectionClass',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('note', models.CharField(max_length=256)),
+            ],
+            options={
+                'verbose_name_plural': 'Inflection classes',
+            },
+        ),
+        migrations.CreateModel(
+            name='InflectionTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('note', models.CharField(max_length=256)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Language',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=256, unique=True)),
+                ('description', models.TextField(blank=True)),
+                ('transliteration', models.JSONField(blank=True, default=dict, help_text='Rules folding alternative spellings for search, e.g. {"cx": "ĉ"}. Run \'manage.py rebuild_search_index\' after changing them.')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ObjectTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100)),
+                ('name', models.CharField(max_length=256)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Word',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transcript', models.CharField(max_length=256)),
+                ('unicode', models.CharField(blank=True, max_length=256)),
+                ('search_key', models.CharField(db_index=True, editable=False, max_length=512)),
+                ('version', models.PositiveIntegerField(default=0, editable=False)),
+                ('modified', models.DateTimeField(auto_now=True, db_index=True)),
+                ('language', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='words', to='app.language')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='WordClass',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('abbr', models.CharField(max_length=10, unique=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Word classes',
+            },
+        ),
+        migrations.CreateModel(
+            name='LanguageStats',
+            fields=[
+                ('language', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='app.language')),
+                ('words', models.PositiveIntegerField(default=0)),
+                ('entries', models.PositiveIntegerField(default=0)),
+                ('examples', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Language stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='WordCard',
+            fields=[
+                ('word', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='app.word')),
+                ('document', models.JSONField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ParadigmRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('suffix', 'Suffix'), ('prefix', 'Prefix'), ('replace', 'Replace')], default='suffix', max_length=10)),
+                ('match', models.CharField(blank=True, max_length=256)),
+                ('value', models.CharField(blank=True, max_length=256)),
+                ('order', models.PositiveIntegerField(default=0)),
+                ('clss', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rules', to='app.inflectionclass')),
+                ('language', models.ForeignKey(blank=True, help_text='Only inflect words of this language.', null=True, on_delete=django.db.models.deletion.CASCADE, to='app.language')),
+                ('tags', models.ManyToManyField(to='app.InflectionTag')),
+            ],
+            options={
+                'ordering': ['order', 'pk'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Orthography',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('font', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.font')),
+                ('glyph_set', models.ForeignKey(blank=True, help_text='Script the language is written in, transliterating its transcripts.', null=True, on_delete=django.db.models.deletion.SET_NULL, to='app.glyphset')),
+                ('language', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.language')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='objecttag',
+            constraint=models.UniqueConstraint(fields=('model', 'name'), name='unique_model_tag'),
+        ),
+        migrations.AddField(
+            model_name='language',
+            name='tags',
+            field=models.ManyToManyField(to='app.ObjectTag'),
+        ),
+        migrations.AddField(
+            model_name='inflectiontag',
+            name='clss',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.inflectionclass'),
+        ),
+        migrations.AddField(
+            model_name='inflectionclass',
+            name='range',
+            field=models.ManyToManyField(to='app.WordClass'),
+        ),
+        migrations.AddField(
+            model_name='inflection',
+            name='generated_by',
+            field=models.ForeignKey(blank=True, editable=False, help_text='Inflection class whose paradigm rules formed this one.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='generated_inflections', to='app.inflectionclass'),
+        ),
+        migrations.AddField(
+            model_name='inflection',
+            name='tags',
+            field=models.ManyToManyField(to='app.InflectionTag'),
+        ),
+        migrations.AddField(
+            model_name='inflection',
+            name='word',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.word'),
+        ),
+        migrations.AddField(
+            model_name='glyph',
+            name='glyph_set',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='glyphs', to='app.glyphset'),
+        ),
+        migrations.AddField(
+            model_name='examplesentence',
+            name='entry',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='examples', to='app.entry'),
+        ),
+        migrations.AddField(
+            model_name='entry',
+            name='tags',
+            field=models.ManyToManyField(to='app.ObjectTag'),
+        ),
+        migrations.AddField(
+            model_name='entry',
+            name='word',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='app.word'),
+        ),
+        migrations.AddField(
+            model_name='entry',
+            name='word_class',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.wordclass'),
+        ),
+        migrations.AddField(
+            model_name='accent',
+            name='word',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.word'),
+        ),
+        migrations.AddIndex(
+            model_name='word',
+            index=models.Index(fields=['transcript', 'version'], name='word_transcript_version'),
+        ),
+        migrations.AddConstraint(
+            model_name='word',
+            constraint=models.UniqueConstraint(fields=('language', 'transcript'), name='unique_language_word'),
+        ),
+    ]
@@ -1,12 +1,26 @@
 import inspect
+import re
 
+from django.core.exceptions import ValidationError
 from django.db import models
 
+from app.services.normalization import fold
+
 
 class Application(models.Model):
     name = models.CharField(max_length=256)
 
 
+class AppliedPreset(models.Model):
+    code = models.CharField(max_length=50, unique=True)
+    version = models.PositiveIntegerField()
+    checksum = models.CharField(max_length=64)
+    applied = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return '%s (v%s)' % (self.code, self.version)
+
+
 class ObjectTag(models.Model):
     model = models.CharField(max_length=100)
     name = models.CharField(max_length=256)
@@ -39,22 +53,58 @@ class GlyphSet(models.Model):
 
 
 class Glyph(models.Model):
-    glyph_set = models.ForeignKey(GlyphSet, on_delete=models.CASCADE)
+    glyph_set = models.ForeignKey(GlyphSet, on_delete=models.CASCADE, related_name='glyphs')
     name = models.CharField(max_length=256)
+    transcript = models.CharField(
+        blank=True, max_length=64, help_text='Latin spelling written with this glyph, e.g. "sh".'
+    )
+    unicode = models.CharField(blank=True, max_length=64, help_text='Text of the glyph in its script.')
 
 
 class Language(models.Model):
     name = models.CharField(max_length=256, unique=True)
     description = models.TextField(blank=True)
     tags = models.ManyToManyField(ObjectTag)
+    transliteration = models.JSONField(
+        default=dict, blank=True,
+        help_text='Rules folding alternative spellings for search, e.g. {"cx": "ĉ"}. '
+                  "Run 'manage.py rebuild_search_index' after changing them."
+    )
+
+    def fold(self, text):
+        """
+        Fold a text into a search key following this language's rules.
+        """
+        return fold(text, self.transliteration)
 
     def __str__(self):
         return self.name
 
 
+class LanguageStats(models.Model):
+    """
+    Row counts of a language, kept up to date by app.services.catalog so
+    the library does not count the lexicon tables.
+    """
+    language = models.OneToOneField(Language, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    words = models.PositiveIntegerField(default=0)
+    entries = models.PositiveIntegerField(default=0)
+    examples = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'Language stats'
+
+    def __str__(self):
+        return str(self.language_id)
+
+
 class Orthography(models.Model):
     language = models.ForeignKey(Language, on_delete=models.CASCADE)
     font = models.ForeignKey(Font, on_delete=models.CASCADE)
+    glyph_set = models.ForeignKey(
+        GlyphSet, null=True, blank=True, on_delete=models.SET_NULL,
+        help_text='Script the language is written in, transliterating its transcripts.'
+    )
 
 
 class WordClass(models.Model):
@@ -72,16 +122,50 @@ class Word(models.Model):
     language = models.ForeignKey(Language, on_delete=models.CASCADE, related_name='words')
     transcript = models.CharField(max_length=256)
     unicode = models.CharField(blank=True, max_length=256)
+    search_key = models.CharField(max_length=512, db_index=True, editable=False)
+    version = models.PositiveIntegerField(default=0, editable=False)
+    modified = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         constraints = [
             models.UniqueConstraint(fields=['language', 'transcript'], name='unique_language_word')
         ]
+        indexes = [
+            models.Index(fields=['transcript', 'version'], name='word_transcript_version'),
+        ]
+
+    def save(self, *args, **kwargs):
+        """
+        Save the word, bumping its version if it already exists.
+
+        The version is incremented in the database, so a stale instance never
+        writes an older version back.
+        """
+        self.search_key = self.language.fold(self.transcript)
+        if self._state.adding:
+            super().save(*args, **kwargs)
+            return
+
+        self.version = models.F('version') + 1
+        super().save(*args, **kwargs)
+        self.refresh_from_db(fields=['version'])
 
     def __str__(self):
         return self.transcript
 
 
+class WordCard(models.Model):
+    """
+    Read model of a word: everything its snippet renders, as one JSON
+    document built by app.services.cards.
+    """
+    word = models.OneToOneField(Word, on_delete=models.CASCADE, primary_key=True, related_name='card')
+    document = models.JSONField()
+
+    def __str__(self):
+        return str(self.word_id)
+
+
 class Accent(models.Model):
     word = models.ForeignKey(Word, on_delete=models.CASCADE)
     ipa = models.CharField(max_length=256)
@@ -113,25 +197,87 @@ class Inflection(models.Model):
     tags = models.ManyToManyField(InflectionTag)
     transcript = models.CharField(max_length=256)
     unicode = models.CharField(blank=True, max_length=256)
+    search_key = models.CharField(max_length=512, db_index=True, editable=False)
+    generated_by = models.ForeignKey(
+        InflectionClass, null=True, blank=True, editable=False, on_delete=models.CASCADE,
+        related_name='generated_inflections', help_text='Inflection class whose paradigm rules formed this one.'
+    )
+
+    def save(self, *args, **kwargs):
+        self.search_key = self.word.language.fold(self.transcript)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.transcript
 
 
+class ParadigmRule(models.Model):
+    """
+    A rule forming an inflection of the words in the range of a class.
+
+    A suffix rule replaces the `match` ending (possibly empty) with `value`,
+    a prefix rule does the same at the start, and a replace rule replaces
+    the first match of the `match` regular expression. A rule applies only
+    to words it matches. Rules of the same class and tags are tried in
+    order, and the first applying one forms the inflection.
+    """
+    SUFFIX = 'suffix'
+    PREFIX = 'prefix'
+    REPLACE = 'replace'
+    KINDS = [(SUFFIX, 'Suffix'), (PREFIX, 'Prefix'), (REPLACE, 'Replace')]
+
+    clss = models.ForeignKey(InflectionClass, on_delete=models.CASCADE, related_name='rules')
+    tags = models.ManyToManyField(InflectionTag)
+    language = models.ForeignKey(
+        Language, null=True, blank=True, on_delete=models.CASCADE, help_text='Only inflect words of this language.'
+    )
+    kind = models.CharField(max_length=10, choices=KINDS, default=SUFFIX)
+    match = models.CharField(blank=True, max_length=256)
+    value = models.CharField(blank=True, max_length=256)
+    order = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['order', 'pk']
+
+    def clean(self):
+        if self.kind == self.REPLACE:
+            try:
+                pattern = re.compile(self.match)
+            except re.error as ex:
+                raise ValidationError({'match': 'Invalid regular expression: %s' % ex})
+            try:
+                pattern.sub(self.value, '')
+            except re.error as ex:
+                raise ValidationError({'value': 'Invalid replacement: %s' % ex})
+
+    def __str__(self):
+        return '%s: %s %s -> %s' % (self.clss, self.kind, self.match, self.value)
+
+
 class Entry(models.Model):
     word = models.ForeignKey(Word, on_delete=models.CASCADE, related_name='entries')
     word_class = models.ForeignKey(WordClass, on_delete=models.CASCADE)
     tags = models.ManyToManyField(ObjectTag)
     paraphrase = models.CharField(max_length=256)
     note = models.CharField(blank=True, max_length=256)
+    search_key = models.CharField(max_length=512, db_index=True, editable=False)
 
     class Meta:
         verbose_name_plural = 'Entries'
 
+    def save(self, *args, **kwargs):
+        self.search_key = self.word.language.fold(self.paraphrase)
+        super().save(*args, **kwargs)
+
 
 class ExampleSentence(models.Model):
     entry = models.ForeignKey(Entry, on_delete=models.CASCADE, related_name='examples')
     transcript = models.CharField(max_length=500)
     unicode = models.CharField(blank=True, max_length=500)
     note = models.CharField(blank=True, max_length=500)
+    search_key = models.CharField(max_length=1000, db_index=True, editable=False)
+
+    def save(self, *args, **kwargs):
+        self.search_key = self.entry.word.language.fold(self.transcript)
+        super().save(*args, **kwargs)
 
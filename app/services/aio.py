@@ -0,0 +1,61 @@
+"""
+Helpers for async views on a Django without an async ORM.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler as DjangoASGIHandler
+from django.db import close_old_connections
+
+
+def database(function):
+    """
+    Wrap a function using the database for use from async code.
+
+    With ASYNC_PARALLEL_QUERIES, calls run in a pool of worker threads, each
+    with its own connection, so that several of them can be awaited
+    concurrently; connections are closed afterwards as at the end of a
+    request, following CONN_MAX_AGE. Otherwise calls run one at a time in
+    the request's thread, like sync views.
+    """
+    if not settings.ASYNC_PARALLEL_QUERIES:
+        return sync_to_async(function)
+
+    def call(*args, **kwargs):
+        try:
+            return function(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(call, thread_sensitive=False)
+
+
+class ASGIHandler(DjangoASGIHandler):
+    """
+    ASGI handler streaming responses from sync code.
+
+    Django 3.2 iterates streaming responses on the event loop, where the
+    ORM may not run, so streams reading the database (such as exports)
+    fail after their headers went out. Here each part is produced in the
+    request's sync thread, as the view itself was.
+    """
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        parts = iter(response)
+        # Django sends the headers and the closing message of an empty
+        # stream; the parts go out in between.
+        response.streaming_content = ()
+        produce = sync_to_async(next, thread_sensitive=True)
+
+        async def send_parts(message):
+            if message['type'] == 'http.response.body' and not message.get('more_body'):
+                part = await produce(parts, None)
+                while part is not None:
+                    for chunk, _ in self.chunk_bytes(part):
+                        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                    part = await produce(parts, None)
+            await send(message)
+
+        return await super().send_response(response, send_parts)
@@ -0,0 +1,115 @@
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from app.models import Word, WordCard
+from app.services.dictionary import group_entries, word_queryset
+
+
+def document(word):
+    """
+    Card document of a word loaded by app.services.dictionary.
+
+    The document is shaped like the word itself, entry groups included, so
+    templates render a card and a word the same way.
+    """
+    return {
+        'pk': word.pk,
+        'transcript': word.transcript,
+        'unicode': word.unicode,
+        'accents': [{'ipa': accent.ipa} for accent in word.accents],
+        'entry_groups': [
+            {
+                'grouper': {'name': group.grouper.name, 'abbr': group.grouper.abbr},
+                'list': [
+                    {
+                        'paraphrase': entry.paraphrase,
+                        'note': entry.note,
+                        'tags': [{'name': tag.name} for tag in entry.tags.all()],
+                        'examples': [
+                            {'transcript': example.transcript, 'unicode': example.unicode, 'note': example.note}
+                            for example in entry.examples.all()
+                        ],
+                    } for entry in group.list
+                ],
+            } for group in word.entry_groups
+        ],
+        'inflections': [
+            {
+                'transcript': inflection.transcript,
+                'unicode': inflection.unicode,
+                'tags': [{'name': tag.name} for tag in inflection.tags.all()],
+            } for inflection in word.inflections
+        ],
+    }
+
+
+def refresh(pks, using=DEFAULT_DB_ALIAS):
+    """
+    Rebuild the cards of the given words, returning their documents by pk.
+
+    Cards another worker built meanwhile are kept, as they are built from
+    the same rows.
+    """
+    words = word_queryset().using(using).filter(pk__in=pks) if pks else []
+    documents = {word.pk: document(group_entries(word)) for word in words}
+
+    with transaction.atomic(using=using):
+        WordCard.objects.using(using).filter(pk__in=pks).delete()
+        WordCard.objects.using(using).bulk_create([
+            WordCard(word_id=pk, document=value) for pk, value in documents.items()
+        ], ignore_conflicts=True)
+    return documents
+
+
+def get_cards(pks):
+    """
+    Return card documents of the given words by pk, in a single read when
+    all of them are built. Missing cards are built on the way.
+    """
+    documents = dict(WordCard.objects.filter(pk__in=pks).values_list('pk', 'document'))
+    missing = set(pks) - set(documents)
+    if missing:
+        documents.update(refresh(missing))
+    return documents
+
+
+def get_card(transcript):
+    """
+    Return the card document of the word with this transcript. Of words of
+    several languages sharing it, return the first one's.
+
+    Words are read with their cards in a single query; missing cards, of
+    all those words, are built on the way. Raise Word.DoesNotExist if there
+    is no such word.
+    """
+    documents = dict(Word.objects.filter(transcript=transcript).values_list('pk', 'card__document'))
+    if not documents:
+        raise Word.DoesNotExist('No word has the transcript %r.' % transcript)
+
+    missing = {pk for pk, document in documents.items() if document is None}
+    if missing:
+        documents.update(refresh(missing))
+    return documents[min(documents)]
+
+
+def resolve(transcripts, language=None):
+    """
+    Return the words with the given transcripts, optionally in one language,
+    as (language name, card document) pairs by transcript.
+
+    Words and their built cards are read together in a single IN query.
+    Missing cards are built on the way. Transcripts without words are left
+    out.
+    """
+    words = Word.objects.filter(transcript__in=transcripts)
+    if language is not None:
+        words = words.filter(language__name=language)
+
+    rows = list(words.order_by('pk').values_list('pk', 'language__name', 'card__document'))
+    missing = {pk for pk, _, document in rows if document is None}
+    built = refresh(missing) if missing else {}
+
+    resolved = {}
+    for pk, language_name, document in rows:
+        document = built[pk] if document is None else document
+        resolved.setdefault(document['transcript'], []).append((language_name, document))
+    return resolved
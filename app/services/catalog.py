@@ -0,0 +1,67 @@
+"""
+Catalog of languages with their word, entry and example counts.
+
+Counting the lexicon tables on every request does not scale, so counts
+are kept per language in LanguageStats and adjusted as rows come and go:
+by signals for rows saved and deleted one at a time, and by bulk loaders
+for the rows they insert. Rows moving to another language have both
+languages counted again.
+"""
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, F
+
+from app.models import Language, LanguageStats, Word, Entry, ExampleSentence
+
+# Count field of each model, and lookup path to its language
+sources = {
+    Word: ('words', 'language'),
+    Entry: ('entries', 'word__language'),
+    ExampleSentence: ('examples', 'entry__word__language'),
+}
+
+
+def adjust(language_id, using=DEFAULT_DB_ALIAS, **changes):
+    """
+    Add to the counts of a language, e.g. adjust(pk, words=1, entries=3).
+    """
+    changes = {field: F(field) + change for field, change in changes.items() if change}
+    if language_id is not None and changes:
+        LanguageStats.objects.using(using).filter(pk=language_id).update(**changes)
+
+
+def recount(language_ids, using=DEFAULT_DB_ALIAS):
+    """
+    Count the rows of the languages from scratch, with a grouped query per
+    model.
+    """
+    counts = {pk: {field: 0 for field, _ in sources.values()} for pk in language_ids if pk is not None}
+    for model, (field, path) in sources.items():
+        rows = model.objects.using(using).filter(**{path + '__in': counts}).values(path).annotate(
+            count=Count('pk')
+        ).order_by().values_list(path, 'count')
+        for pk, count in rows:
+            counts[pk][field] = count
+
+    with transaction.atomic(using=using):
+        LanguageStats.objects.using(using).filter(pk__in=counts).delete()
+        LanguageStats.objects.using(using).bulk_create([
+            LanguageStats(language_id=pk, **values) for pk, values in counts.items()
+        ])
+
+
+def catalog():
+    """
+    Return the languages by name, with their counts, in a single query.
+
+    Languages without counts, such as those created before counting began,
+    are counted first.
+    """
+    languages = list(Language.objects.order_by('name').values(
+        'pk', 'name', 'description',
+        word_count=F('stats__words'), entry_count=F('stats__entries'), example_count=F('stats__examples'),
+    ))
+    missing = [language['pk'] for language in languages if language['word_count'] is None]
+    if missing:
+        recount(missing)
+        return catalog()
+    return languages
@@ -0,0 +1,41 @@
+from itertools import groupby
+
+from django.db.models import Prefetch
+from django.template.defaulttags import GroupedResult
+
+from app.models import Word, Entry, Inflection
+
+
+def word_queryset():
+    """
+    Word queryset fetching everything a word page renders.
+
+    Entries (with their word classes), example sentences, entry tags, accents
+    and inflections (with their tags) are fetched in a fixed number of queries,
+    regardless of how many entries a word has.
+    """
+    entries = Entry.objects.select_related('word_class').prefetch_related(
+        'examples', 'tags'
+    ).order_by('word_class_id', 'id')
+    inflections = Inflection.objects.prefetch_related('tags').order_by('id')
+
+    return Word.objects.select_related('language').prefetch_related(
+        Prefetch('entries', queryset=entries),
+        Prefetch('accent_set', to_attr='accents'),
+        Prefetch('inflection_set', queryset=inflections, to_attr='inflections'),
+    )
+
+
+def group_entries(word):
+    """
+    Group prefetched entries of a word by word class.
+
+    The result is shaped like the output of the regroup tag, so templates can
+    iterate `group.grouper` and `group.list` without issuing queries.
+    """
+    word.entry_groups = [
+        GroupedResult(grouper=word_class, list=list(entries))
+        for word_class, entries in groupby(word.entries.all(), key=lambda e: e.word_class)
+    ]
+    return word
+
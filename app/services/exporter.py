@@ -0,0 +1,69 @@
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.timezone import is_naive, make_aware
+
+from app.services.dictionary import word_queryset
+from app.services.formats import record
+
+
+def word_record(word):
+    return record(
+        word.language.name, word.transcript, word.unicode,
+        accents=[accent.ipa for accent in word.accents],
+        entries=[
+            {
+                'class': entry.word_class.name,
+                'abbr': entry.word_class.abbr,
+                'paraphrase': entry.paraphrase,
+                'note': entry.note,
+                'tags': [tag.name for tag in entry.tags.all()],
+                'examples': [
+                    {'transcript': example.transcript, 'unicode': example.unicode, 'note': example.note}
+                    for example in entry.examples.all()
+                ],
+            } for entry in word.entries.all()
+        ],
+        inflections=[
+            {
+                'transcript': inflection.transcript,
+                'unicode': inflection.unicode,
+                'tags': [tag.name for tag in inflection.tags.all()],
+            } for inflection in word.inflections
+        ],
+    )
+
+
+def watermark(value):
+    """
+    Parse an export watermark, either an ISO 8601 date or date and time.
+    """
+    moment = parse_datetime(value)
+    if moment is None:
+        date = parse_date(value)
+        if date is None:
+            raise ValueError("Invalid date '%s'." % value)
+        moment = parse_datetime(date.isoformat() + 'T00:00')
+    return make_aware(moment) if is_naive(moment) else moment
+
+
+def export_words(language, since=None, chunk_size=500, using=DEFAULT_DB_ALIAS):
+    """
+    Yield records of the words of a language, in primary key order.
+
+    Words are read in keyset-paginated chunks (pk > last pk seen), each
+    loaded with a fixed number of queries, so memory stays flat however
+    large the language is. With `since`, only words modified at or after
+    that time are exported.
+    """
+    words = word_queryset().using(using).filter(language=language).order_by('pk')
+    if since is not None:
+        words = words.filter(modified__gte=since)
+
+    last = 0
+    while True:
+        chunk = list(words.filter(pk__gt=last)[:chunk_size])
+        if not chunk:
+            return
+        for word in chunk:
+            yield word_record(word)
+        last = chunk[-1].pk
@@ -0,0 +1,256 @@
+"""
+Font subsets of the characters a page shows in the script of its language.
+
+Orthography fonts can be large, while a word page uses a few dozen of their
+glyphs. Pages link to a subset of the font holding just the characters
+they show, converted to WOFF2 with the fontTools and brotli packages.
+Should they be missing, the whole font is served, under its own extension.
+
+Subset URLs carry the hash of the font file and the characters, so their
+content never changes and they are served with immutable cache headers.
+The characters are signed, so clients cannot have subsets made of
+characters of their own. Subsets are kept in FONT_CACHE_DIR, bounded in
+size by FONT_CACHE_SIZE.
+"""
+import mimetypes
+import os
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from functools import lru_cache
+from hashlib import md5, sha256
+from io import BytesIO
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+
+from django.conf import settings
+from django.core.signing import BadSignature, Signer
+from django.urls import reverse
+
+from app.models import Orthography
+
+try:
+    import brotli
+    from fontTools import subset as font_subset
+except ImportError:
+    brotli = font_subset = None
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# CSS format() hints of font file extensions
+FORMATS = {'woff2': 'woff2', 'woff': 'woff', 'ttf': 'truetype', 'otf': 'opentype'}
+
+
+class FontError(ValueError):
+    pass
+
+
+def subsetting_available():
+    return font_subset is not None and brotli is not None
+
+
+def characters(*texts):
+    """
+    Return the distinct characters of the texts, sorted, leaving out white
+    space.
+    """
+    return ''.join(sorted({char for text in texts for char in text if not char.isspace()}))
+
+
+def signer():
+    return Signer(salt='app.services.fonts')
+
+
+def encode_text(text):
+    return signer().sign(urlsafe_b64encode(text.encode()).decode().rstrip('='))
+
+
+def decode_text(token):
+    """
+    Decode the characters of a subset URL. Return None if the token is
+    malformed, not signed by this site or names more than
+    FONT_SUBSET_MAX_CHARS characters.
+    """
+    try:
+        token = signer().unsign(token)
+        text = urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+    except (BadSignature, ValueError):
+        return None
+    if not text or len(text) > settings.FONT_SUBSET_MAX_CHARS:
+        return None
+    return characters(text)
+
+
+@lru_cache(maxsize=64)
+def file_hash(path, size, modified):
+    """
+    Hash the content of a font file. The file is only read again once its
+    size or modification time changed.
+    """
+    digest = sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def font_hash(font):
+    """
+    Return the hash of the content of the font's file.
+
+    Raise FontError if the file cannot be read.
+    """
+    try:
+        stat = os.stat(font.file)
+        return file_hash(font.file, stat.st_size, stat.st_mtime_ns)
+    except OSError as ex:
+        raise FontError("Font '%s' cannot be read: %s" % (font.name, ex)) from ex
+
+
+def font_extension(font):
+    """
+    Return the extension of the URLs of the font: WOFF2 for subsets, and
+    that of the font file when it is served whole.
+    """
+    if subsetting_available():
+        return 'woff2'
+    return Path(font.file).suffix.lstrip('.').lower() or 'font'
+
+
+def subset_url(font, text):
+    return reverse('font', args=(font.pk, font_hash(font), encode_text(characters(text)), font_extension(font)))
+
+
+def font_faces(languages, *texts):
+    """
+    Return the font faces showing the texts in the orthographies of the
+    languages, as dicts of a CSS font family, a subset URL and its format,
+    if known. Fonts whose file cannot be read are left out.
+
+    Texts without characters need no fonts, and no query is made.
+    """
+    text = characters(*texts)
+    if not text:
+        return []
+
+    faces = []
+    for orthography in Orthography.objects.filter(language__in=languages).select_related('font'):
+        try:
+            url = subset_url(orthography.font, text)
+        except FontError:
+            continue
+        faces.append({
+            'family': 'orthography-%s' % orthography.pk,
+            'url': url,
+            'format': FORMATS.get(font_extension(orthography.font)),
+        })
+    return faces
+
+
+def card_texts(document):
+    """
+    Return the unicode texts a word page shows of a card document.
+    """
+    texts = [document['unicode']]
+    for group in document['entry_groups']:
+        for entry in group['list']:
+            texts += [example['unicode'] for example in entry['examples']]
+    return texts
+
+
+class SubsetCache:
+    """
+    Directory of font subsets bounded in total size, evicting the least
+    recently used ones.
+
+    Reading a subset touches its file, so modification times order files
+    by last use. Files are written under a temporary name and renamed, so
+    concurrent readers never see a partial file.
+    """
+
+    def __init__(self, directory, max_size):
+        self.directory = Path(directory)
+        self.max_size = max_size
+
+    def path(self, key):
+        return self.directory / ('%s.woff2' % key)
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return data
+
+    def set(self, key, data):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with NamedTemporaryFile(dir=self.directory, suffix='.tmp', delete=False) as file:
+            file.write(data)
+        os.replace(file.name, self.path(key))
+        self.evict()
+
+    def evict(self):
+        files, total = [], 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.woff2'):
+                stat = entry.stat()
+                files.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                total += stat.st_size
+
+        for _, size, path in sorted(files):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def get_cache():
+    return SubsetCache(settings.FONT_CACHE_DIR, settings.FONT_CACHE_SIZE)
+
+
+def make_subset(path, text):
+    """
+    Subset a font file to the characters of the text, as WOFF2.
+    """
+    options = font_subset.Options()
+    options.flavor = 'woff2'
+    # Scripts may join glyphs through ligatures and contextual forms.
+    options.layout_features = ['*']
+    font = font_subset.load_font(path, options)
+    subsetter = font_subset.Subsetter(options)
+    subsetter.populate(text=text)
+    subsetter.subset(font)
+
+    output = BytesIO()
+    font_subset.save_font(font, output, options)
+    return output.getvalue()
+
+
+def subset(font, text):
+    """
+    Return the content and type of the subset of the font holding the
+    characters of the text, from the cache when it was made before.
+
+    Without fontTools, return the whole font file. Raise FontError if the
+    font cannot be read or subset.
+    """
+    if not subsetting_available():
+        content_type = mimetypes.guess_type(font.file)[0] or 'application/octet-stream'
+        try:
+            return Path(font.file).read_bytes(), content_type
+        except OSError as ex:
+            raise FontError("Font '%s' cannot be read: %s" % (font.name, ex)) from ex
+
+    cache = get_cache()
+    key = md5(('%s:%s' % (font_hash(font), characters(text))).encode()).hexdigest()
+    data = cache.get(key)
+    if data is None:
+        try:
+            data = make_subset(font.file, text)
+        except Exception as ex:
+            raise FontError("Font '%s' cannot be subset: %s" % (font.name, ex)) from ex
+        cache.set(key, data)
+    return data, 'font/woff2'
@@ -0,0 +1,286 @@
+"""
+Dictionary interchange formats.
+
+Every format is read into, and written from, word records shaped like a
+line of the JSONL format::
+
+    {
+        "language": "Esperanto",
+        "word": "kordo",
+        "unicode": "",
+        "accents": ["ˈkordo"],
+        "entries": [{
+            "class": "Noun",
+            "abbr": "n",
+            "paraphrase": "Fadeno el bestaj intestoj...",
+            "note": "",
+            "tags": ["Muziko"],
+            "examples": [{"transcript": "La arĉo kuradis...", "unicode": "", "note": ""}]
+        }],
+        "inflections": [{"transcript": "kordoj", "unicode": "", "tags": ["Plural"]}]
+    }
+
+Every entry must have a word class and a paraphrase.
+
+CSV files have one entry per row, with tags separated by ';' and examples
+by line breaks within the cell; a row without a paraphrase holds a word
+without entries. CSV files carry neither accents nor inflections.
+
+TEI files follow TEI Lex-0: an <entry> per word, holding a lemma <form>,
+inflected <form>s and a <sense> per entry. TEI files, and CSV files
+without a language column, do not name the language, so it must be given
+when reading them.
+"""
+import csv
+import json
+from xml.etree.ElementTree import Element, SubElement, iterparse, tostring
+
+FORMATS = ('jsonl', 'csv', 'tei')
+
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'tei': 'application/tei+xml',
+}
+
+EXTENSIONS = {
+    'jsonl': 'jsonl',
+    'csv': 'csv',
+    'tei': 'xml',
+}
+
+CSV_FIELDS = ('language', 'word', 'unicode', 'class', 'abbr', 'paraphrase', 'note', 'tags', 'examples')
+
+
+class FormatError(ValueError):
+    pass
+
+
+def guess_format(path):
+    extension = str(path).rsplit('.', 1)[-1].lower()
+    return {'json': 'jsonl', 'ndjson': 'jsonl', 'xml': 'tei'}.get(extension, extension)
+
+
+def record(language, word, unicode='', accents=(), entries=(), inflections=()):
+    if not language:
+        raise FormatError("Word '%s' has no language." % word)
+    if not word:
+        raise FormatError('A word must have a transcript.')
+    entries = list(entries)
+    for entry in entries:
+        if not entry.get('class'):
+            raise FormatError("An entry of word '%s' has no word class." % word)
+        if not entry.get('paraphrase'):
+            raise FormatError("An entry of word '%s' has no paraphrase." % word)
+
+    return {
+        'language': language,
+        'word': word,
+        'unicode': unicode or '',
+        'accents': list(accents),
+        'entries': [
+            {
+                'class': entry['class'],
+                'abbr': entry.get('abbr') or None,
+                'paraphrase': entry['paraphrase'],
+                'note': entry.get('note') or '',
+                'tags': list(entry.get('tags') or ()),
+                'examples': [
+                    {
+                        'transcript': example['transcript'],
+                        'unicode': example.get('unicode') or '',
+                        'note': example.get('note') or '',
+                    } for example in entry.get('examples') or ()
+                ],
+            } for entry in entries
+        ],
+        'inflections': [
+            {
+                'transcript': inflection['transcript'],
+                'unicode': inflection.get('unicode') or '',
+                'tags': list(inflection.get('tags') or ()),
+            } for inflection in inflections
+        ],
+    }
+
+
+def read_jsonl(stream, language=None):
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+            yield record(
+                item.get('language') or language, item.get('word'), item.get('unicode'),
+                item.get('accents') or (), item.get('entries') or (), item.get('inflections') or ()
+            )
+        except (ValueError, KeyError, TypeError) as ex:
+            raise FormatError('Line %s: %s' % (line_number, ex)) from ex
+
+
+def read_csv(stream, language=None):
+    reader = csv.DictReader(stream)
+    for row in reader:
+        try:
+            entries = [{
+                'class': row['class'],
+                'abbr': row.get('abbr'),
+                'paraphrase': row['paraphrase'],
+                'note': row.get('note'),
+                'tags': [tag.strip() for tag in (row.get('tags') or '').split(';') if tag.strip()],
+                'examples': [
+                    {'transcript': line.strip()} for line in (row.get('examples') or '').splitlines() if line.strip()
+                ],
+            }] if row['paraphrase'] else []
+            yield record(row.get('language') or language, row.get('word'), row.get('unicode'), entries=entries)
+        except KeyError as ex:
+            raise FormatError('Line %s: missing column %s.' % (reader.line_num, ex)) from ex
+
+
+def local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def children(element, name):
+    return [child for child in element if local_name(child.tag) == name]
+
+
+def text_of(element, *path):
+    for name in path:
+        found = children(element, name) if element is not None else []
+        element = found[0] if found else None
+    return ''.join(element.itertext()).strip() if element is not None else ''
+
+
+def read_tei(stream, language=None):
+    """
+    Read TEI Lex-0 entries, keeping memory flat by discarding each <entry>
+    once it is read.
+    """
+    for _, element in iterparse(stream, events=('end',)):
+        if local_name(element.tag) != 'entry':
+            continue
+
+        forms = [form for form in children(element, 'form') if form.get('type', 'lemma') == 'lemma']
+        lemma = forms[0] if forms else None
+        entry_pos = text_of(element, 'gramGrp', 'pos')
+        entries = []
+
+        for sense in children(element, 'sense'):
+            entries.append({
+                'class': text_of(sense, 'gramGrp', 'pos') or entry_pos,
+                'paraphrase': text_of(sense, 'def'),
+                'note': text_of(sense, 'note'),
+                'tags': [''.join(usg.itertext()).strip() for usg in children(sense, 'usg')],
+                'examples': [
+                    {'transcript': text_of(cit, 'quote')}
+                    for cit in children(sense, 'cit') if cit.get('type') == 'example'
+                ],
+            })
+
+        accents = children(lemma, 'pron') if lemma is not None else []
+        inflections = [
+            {
+                'transcript': text_of(form, 'orth'),
+                'tags': [''.join(gram.itertext()).strip() for gram in form.iter() if local_name(gram.tag) == 'gram'],
+            }
+            for form in children(element, 'form') if form.get('type') == 'inflected'
+        ]
+        yield record(
+            language,
+            text_of(lemma, 'orth'),
+            accents=[''.join(pron.itertext()).strip() for pron in accents],
+            entries=entries,
+            inflections=inflections,
+        )
+        element.clear()
+
+
+readers = {
+    'jsonl': read_jsonl,
+    'csv': read_csv,
+    'tei': read_tei,
+}
+
+
+def write_jsonl(records, language=None):
+    for item in records:
+        yield json.dumps(item, ensure_ascii=False) + '\n'
+
+
+class Echo:
+    """
+    File-like object handing back what is written, so csv.writer can
+    produce rows one at a time.
+    """
+
+    def write(self, value):
+        return value
+
+
+def write_csv(records, language=None):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_FIELDS)
+
+    for item in records:
+        word = (item['language'], item['word'], item['unicode'])
+        if not item['entries']:
+            yield writer.writerow(word + ('',) * (len(CSV_FIELDS) - len(word)))
+        for entry in item['entries']:
+            yield writer.writerow(word + (
+                entry['class'], entry['abbr'] or '', entry['paraphrase'], entry['note'],
+                ';'.join(entry['tags']),
+                '\n'.join(example['transcript'] for example in entry['examples']),
+            ))
+
+
+def tei_entry(item):
+    entry = Element('entry')
+    lemma = SubElement(entry, 'form', type='lemma')
+    SubElement(lemma, 'orth').text = item['word']
+    for ipa in item['accents']:
+        SubElement(lemma, 'pron').text = ipa
+
+    for inflection in item['inflections']:
+        form = SubElement(entry, 'form', type='inflected')
+        SubElement(form, 'orth').text = inflection['transcript']
+        if inflection['tags']:
+            group = SubElement(form, 'gramGrp')
+            for tag in inflection['tags']:
+                SubElement(group, 'gram').text = tag
+
+    for item_entry in item['entries']:
+        sense = SubElement(entry, 'sense')
+        SubElement(SubElement(sense, 'gramGrp'), 'pos').text = item_entry['class']
+        SubElement(sense, 'def').text = item_entry['paraphrase']
+        if item_entry['note']:
+            SubElement(sense, 'note').text = item_entry['note']
+        for tag in item_entry['tags']:
+            SubElement(sense, 'usg').text = tag
+        for example in item_entry['examples']:
+            SubElement(SubElement(sense, 'cit', type='example'), 'quote').text = example['transcript']
+
+    return tostring(entry, encoding='unicode')
+
+
+def write_tei(records, language=None):
+    """
+    Write a TEI Lex-0 document, one <entry> at a time.
+    """
+    header = Element('teiHeader')
+    title = SubElement(SubElement(SubElement(header, 'fileDesc'), 'titleStmt'), 'title')
+    title.text = language or ''
+
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n<TEI xmlns="http://www.tei-c.org/ns/1.0">'
+    yield tostring(header, encoding='unicode')
+    yield '<text><body>\n'
+    for item in records:
+        yield tei_entry(item) + '\n'
+    yield '</body></text></TEI>\n'
+
+
+writers = {
+    'jsonl': write_jsonl,
+    'csv': write_csv,
+    'tei': write_tei,
+}
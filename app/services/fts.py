@@ -0,0 +1,154 @@
+"""
+SQLite FTS5 full text index with a trigram tokenizer.
+
+Each registered field gets an external content FTS5 table, named after the
+model's table with an '_fts' suffix, which indexes the field by the rowid of
+the source row. Triggers on the source table keep the index in sync, so
+bulk inserts and raw updates are covered as well.
+
+The trigram tokenizer makes substring queries of three or more characters
+index lookups. Shorter queries, and databases other than SQLite, fall back
+to plain lookups.
+"""
+from functools import reduce
+from operator import or_
+
+from django.db import connections, router, DEFAULT_DB_ALIAS
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+MIN_QUERY_LENGTH = 3
+
+_sources = []
+_installed = {}
+
+
+def register(model, field):
+    """
+    Register a model field to the search index.
+    """
+    _sources.append((model, field))
+
+
+def fts_table(model):
+    return '%s_fts' % model._meta.db_table
+
+
+def is_supported(connection):
+    return connection.vendor == 'sqlite'
+
+
+def _statements(model, field):
+    table = model._meta.db_table
+    column = model._meta.get_field(field).column
+    fts = fts_table(model)
+    pk = model._meta.pk.column
+    insert = 'INSERT INTO %s(rowid, %s) VALUES (new.%s, new.%s);' % (fts, column, pk, column)
+    delete = "INSERT INTO %s(%s, rowid, %s) VALUES ('delete', old.%s, old.%s);" % (
+        fts, fts, column, pk, column
+    )
+
+    return [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS %s USING fts5(%s, content='%s', content_rowid='%s', "
+        "tokenize='trigram')" % (fts, column, table, pk),
+        'CREATE TRIGGER IF NOT EXISTS %s_ai AFTER INSERT ON %s BEGIN %s END' % (fts, table, insert),
+        'CREATE TRIGGER IF NOT EXISTS %s_ad AFTER DELETE ON %s BEGIN %s END' % (fts, table, delete),
+        'CREATE TRIGGER IF NOT EXISTS %s_au AFTER UPDATE OF %s ON %s BEGIN %s %s END' % (
+            fts, column, table, delete, insert
+        ),
+    ]
+
+
+def install(using=DEFAULT_DB_ALIAS):
+    """
+    Create the index tables and their triggers if they do not exist yet.
+
+    Return False if the database does not support the index.
+    """
+    connection = connections[using]
+    if not is_supported(connection):
+        return False
+
+    with connection.cursor() as cursor:
+        for model, field in _sources:
+            for statement in _statements(model, field):
+                cursor.execute(statement)
+
+    _installed[using] = True
+    return True
+
+
+def uninstall(using=DEFAULT_DB_ALIAS):
+    connection = connections[using]
+    if not is_supported(connection):
+        return
+
+    with connection.cursor() as cursor:
+        for model, _ in _sources:
+            fts = fts_table(model)
+            for suffix in ('ai', 'ad', 'au'):
+                cursor.execute('DROP TRIGGER IF EXISTS %s_%s' % (fts, suffix))
+            cursor.execute('DROP TABLE IF EXISTS %s' % fts)
+
+    _installed[using] = False
+
+
+def rebuild(using=DEFAULT_DB_ALIAS):
+    """
+    Recreate the index from scratch and fill it from the source tables.
+    """
+    uninstall(using)
+    if not install(using):
+        return False
+
+    with connections[using].cursor() as cursor:
+        for model, _ in _sources:
+            fts = fts_table(model)
+            cursor.execute("INSERT INTO %s(%s) VALUES ('rebuild')" % (fts, fts))
+    return True
+
+
+def is_installed(using=DEFAULT_DB_ALIAS):
+    if using not in _installed:
+        connection = connections[using]
+        _installed[using] = is_supported(connection) and all(
+            fts_table(model) in connection.introspection.table_names()
+            for model, _ in _sources
+        )
+    return _installed[using]
+
+
+def contains(model, field, values, prefix='', using=DEFAULT_DB_ALIAS):
+    """
+    Filter rows whose field contains any of the values.
+
+    A prefix may be given to filter a related model by the indexed field,
+    e.g. contains(Word, 'search_key', values, prefix='word__').
+    """
+    if min(len(value) for value in values) < MIN_QUERY_LENGTH or not is_installed(using):
+        return reduce(or_, (Q(**{'%s%s__contains' % (prefix, field): value}) for value in values))
+
+    fts = fts_table(model)
+    phrases = ' OR '.join('"%s"' % value.replace('"', '""') for value in values)
+    return Q(**{'%spk__in' % prefix: RawSQL(
+        'SELECT rowid FROM %s WHERE %s MATCH %%s' % (fts, fts), (phrases,)
+    )})
+
+
+def post_migrate_handler(using=DEFAULT_DB_ALIAS, **_):
+    """
+    Install the index once the source tables are migrated, and drop it
+    once they are unmigrated, as its triggers would point at missing tables.
+    """
+    connection = connections[using]
+    if not is_supported(connection):
+        return
+
+    tables = set(connection.introspection.table_names())
+    if all(
+        router.allow_migrate_model(using, model) and model._meta.db_table in tables
+        for model, _ in _sources
+    ):
+        install(using)
+    else:
+        uninstall(using)
@@ -0,0 +1,126 @@
+from collections import defaultdict
+
+from app.services.indexes import WordIndex, LanguageIndexes
+
+MAX_DISTANCE = 2
+PREFIX_LENGTH = 7
+
+
+def deletes(key, max_distance=MAX_DISTANCE):
+    """
+    Return the key's prefix with up to `max_distance` characters deleted,
+    the key's prefix itself included.
+    """
+    level = {key[:PREFIX_LENGTH]}
+    variants = set(level)
+
+    for _ in range(max_distance):
+        level = {variant[:i] + variant[i + 1:] for variant in level for i in range(len(variant))}
+        variants |= level
+    return variants
+
+
+def distance(source, target, max_distance=MAX_DISTANCE):
+    """
+    Optimal string alignment distance between two strings.
+
+    Return max_distance + 1 as soon as the distance is known to exceed it.
+    """
+    if abs(len(source) - len(target)) > max_distance:
+        return max_distance + 1
+
+    previous2, previous = None, list(range(len(target) + 1))
+    for i, char in enumerate(source, 1):
+        current = [i] + [0] * len(target)
+        for j, other in enumerate(target, 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char != other),
+            )
+            if i > 1 and j > 1 and char == target[j - 2] and source[i - 2] == other:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class SpellIndex(WordIndex):
+    """
+    Symmetric delete (SymSpell) index of the words of a language.
+
+    Every search key is indexed under the deletions of its first
+    PREFIX_LENGTH characters. A misspelling within MAX_DISTANCE edits shares
+    at least one deletion with the word, so a lookup only verifies the few
+    candidates found under the query's own deletions.
+    """
+
+    def __init__(self, rules, rows=()):
+        super().__init__(rules, rows)
+        self.keys = defaultdict(set)
+        self.deletes = defaultdict(set)
+
+        for pk, (key, _) in self.words.items():
+            self.index(pk, key)
+
+    def index(self, pk, key):
+        if not self.keys[key]:
+            for variant in deletes(key):
+                self.deletes[variant].add(key)
+        self.keys[key].add(pk)
+
+    def add(self, pk, key, transcript):
+        self.remove(pk)
+        self.words[pk] = (key, transcript)
+        self.index(pk, key)
+
+    def remove(self, pk):
+        if pk not in self.words:
+            return
+        key, _ = self.words.pop(pk)
+        self.keys[key].discard(pk)
+
+        if not self.keys[key]:
+            del self.keys[key]
+            for variant in deletes(key):
+                self.deletes[variant].discard(key)
+                if not self.deletes[variant]:
+                    del self.deletes[variant]
+
+    def lookup(self, key, max_distance=MAX_DISTANCE):
+        """
+        Return (distance, transcript) pairs of words within max_distance.
+        """
+        candidates = set()
+        for variant in deletes(key, max_distance):
+            candidates.update(self.deletes.get(variant, ()))
+
+        matches = []
+        for candidate in candidates:
+            edits = distance(key, candidate, max_distance)
+            if edits <= max_distance:
+                matches += [(edits, self.words[pk][1]) for pk in self.keys[candidate]]
+        return matches
+
+
+indexes = LanguageIndexes(SpellIndex)
+
+
+def did_you_mean(value, languages=None, limit=5, max_distance=MAX_DISTANCE):
+    """
+    Return up to `limit` words closest to the value, as (language_id,
+    transcript) pairs ordered by edit distance.
+    """
+    matches = []
+
+    for language_id, index in indexes.get().items():
+        if languages is None or language_id in languages:
+            key = index.fold(value)
+            if key:
+                matches += [
+                    (edits, transcript, language_id) for edits, transcript in index.lookup(key, max_distance)
+                ]
+
+    matches.sort()
+    return [(language_id, transcript) for _, transcript, language_id in matches[:limit]]
@@ -0,0 +1,315 @@
+from collections import Counter
+from itertools import islice
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Max
+
+from app.models import (
+    Language, WordClass, Word, Accent, Entry, ExampleSentence, ObjectTag, InflectionClass, InflectionTag, Inflection
+)
+from app.services import catalog, indexes, pages
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def bulk_insert(model, objects, batch_size=1000, using=DEFAULT_DB_ALIAS):
+    """
+    Insert objects with bulk_create, setting their primary keys.
+
+    Backends which cannot return primary keys from bulk inserts (like
+    SQLite) get them allocated past the current maximum. That is safe as
+    long as bulk inserts do not run concurrently with other writers.
+    """
+    if not objects:
+        return
+    if not connections[using].features.can_return_rows_from_bulk_insert:
+        start = (model.objects.using(using).aggregate(last=Max('pk'))['last'] or 0) + 1
+        for pk, instance in enumerate(objects, start):
+            instance.pk = pk
+
+    model.objects.using(using).bulk_create(objects, batch_size=batch_size)
+
+
+def numbered_abbr(abbr, number, max_length=10):
+    """
+    Return the abbreviation truncated, with the number appended unless it
+    is the first.
+    """
+    suffix = str(number) if number > 1 else ''
+    return abbr[:max_length - len(suffix)] + suffix
+
+
+def insert_rows(model, fields, rows, using=DEFAULT_DB_ALIAS):
+    """
+    Insert rows of values of the named fields with a single executemany().
+
+    Unlike bulk_create, this builds no model instances, so it suits very
+    large inserts. Values must already be database values.
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    columns = [model._meta.get_field(name).column for name in fields]
+    sql = 'INSERT INTO %s (%s) VALUES (%s)' % (
+        quote(model._meta.db_table), ', '.join(quote(column) for column in columns), ', '.join(['%s'] * len(columns))
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+class DictionaryImporter:
+    """
+    Bulk loader of word records, as read by app.services.formats.
+
+    Records are loaded in chunks, each in its own transaction. Languages,
+    word classes, words and tags of a chunk are resolved with one lookup
+    per model, and missing rows are inserted with bulk_create. Entries
+    identical to an existing one (same word, class and paraphrase), and
+    existing accents and inflections are skipped, so importing a file
+    twice is harmless.
+
+    Missing languages and word classes are created; a word class without
+    an abbreviation gets its name, truncated, as one, numbered if another
+    class has it already. Inflection tags are matched by name, and missing
+    ones created in the IMPORTED_CLASS inflection class. Tags listed twice
+    on an entry or inflection are linked once. The counts of the catalog
+    are adjusted with an update per language and chunk.
+    """
+
+    # Inflection class of the inflection tags created by imports
+    IMPORTED_CLASS = 'Imported'
+
+    def __init__(self, batch_size=1000, using=DEFAULT_DB_ALIAS):
+        self.batch_size = batch_size
+        self.using = using
+        self.languages = {}
+        self.word_classes = {}
+        self.tags = {}
+        self.inflection_tags = {}
+        self.counts = Counter()
+
+    def objects(self, model):
+        return model.objects.using(self.using)
+
+    def insert(self, model, objects):
+        if not objects:
+            return
+        bulk_insert(model, objects, self.batch_size, self.using)
+        self.counts[str(model._meta.verbose_name_plural)] += len(objects)
+
+    def resolve_languages(self, names):
+        missing = set(names) - set(self.languages)
+        for language in self.objects(Language).filter(name__in=missing):
+            self.languages[language.name] = language
+
+        for name in missing - set(self.languages):
+            language = Language(name=name)
+            language.save(using=self.using)
+            self.languages[name] = language
+            self.counts[str(Language._meta.verbose_name_plural)] += 1
+
+    def resolve_word_classes(self, classes):
+        missing = {name: abbr for name, abbr in classes if name not in self.word_classes}
+        for word_class in self.objects(WordClass).filter(name__in=missing):
+            self.word_classes[word_class.name] = word_class.pk
+
+        # Abbreviations taken by other classes get numbered, trying each
+        # number with one lookup.
+        pending = {name: abbr or name for name, abbr in missing.items() if name not in self.word_classes}
+        created, taken, number = [], set(), 1
+        while pending:
+            candidates = {name: numbered_abbr(abbr, number) for name, abbr in pending.items()}
+            taken.update(self.objects(WordClass).filter(abbr__in=candidates.values()).values_list('abbr', flat=True))
+            for name, abbr in candidates.items():
+                if abbr not in taken:
+                    taken.add(abbr)
+                    created.append(WordClass(name=name, abbr=abbr))
+                    del pending[name]
+            number += 1
+        self.insert(WordClass, created)
+        self.word_classes.update((word_class.name, word_class.pk) for word_class in created)
+
+    def resolve_tags(self, names):
+        missing = set(names) - set(self.tags)
+        for pk, name in self.objects(ObjectTag).filter(model='Entry', name__in=missing).values_list('pk', 'name'):
+            self.tags[name] = pk
+
+        created = [ObjectTag(model='Entry', name=name) for name in missing - set(self.tags)]
+        self.insert(ObjectTag, created)
+        self.tags.update((tag.name, tag.pk) for tag in created)
+
+    def resolve_inflection_tags(self, names):
+        missing = set(names) - set(self.inflection_tags)
+        # Of tags sharing a name, the first one is linked.
+        for pk, name in self.objects(InflectionTag).filter(name__in=missing).order_by('-pk').values_list('pk', 'name'):
+            self.inflection_tags[name] = pk
+
+        missing -= set(self.inflection_tags)
+        if not missing:
+            return
+        inflection_class = self.objects(InflectionClass).filter(name=self.IMPORTED_CLASS).order_by('pk').first()
+        if inflection_class is None:
+            inflection_class = InflectionClass(name=self.IMPORTED_CLASS, note='')
+            inflection_class.save(using=self.using)
+        created = [InflectionTag(clss=inflection_class, name=name, note='') for name in missing]
+        self.insert(InflectionTag, created)
+        self.inflection_tags.update((tag.name, tag.pk) for tag in created)
+
+    def resolve_words(self, records):
+        """
+        Return a mapping from (language name, transcript) to word ids, and
+        the (id, transcript) pairs of the words which existed already.
+        """
+        keys = {(record['language'], record['word']): record for record in records}
+        words, existing = {}, set()
+        rows = self.objects(Word).filter(
+            language__name__in={language for language, _ in keys},
+            transcript__in={transcript for _, transcript in keys},
+        ).values_list('pk', 'language__name', 'transcript')
+
+        for pk, language, transcript in rows:
+            if (language, transcript) in keys:
+                words[language, transcript] = pk
+                existing.add((pk, transcript))
+
+        created = []
+        for (language, transcript), record in keys.items():
+            if (language, transcript) not in words:
+                created.append(Word(
+                    language=self.languages[language],
+                    transcript=transcript,
+                    unicode=record['unicode'],
+                    search_key=self.languages[language].fold(transcript),
+                ))
+        self.insert(Word, created)
+        words.update(((word.language.name, word.transcript), word.pk) for word in created)
+
+        return words, existing
+
+    def count(self, words, existing_ids, entry_records):
+        """
+        Add the words, entries and examples inserted by a chunk to the counts
+        of their languages.
+        """
+        existing_ids = set(existing_ids)
+        added = {}
+        for (language, _), pk in words.items():
+            if pk not in existing_ids:
+                added.setdefault(self.languages[language].pk, Counter())['words'] += 1
+        for item, language in entry_records:
+            counts = added.setdefault(language.pk, Counter())
+            counts['entries'] += 1
+            counts['examples'] += len(item['examples'])
+
+        for language_id, counts in added.items():
+            catalog.adjust(language_id, self.using, **counts)
+
+    def load(self, records):
+        """
+        Load a chunk of records in a single transaction.
+        """
+        from app.signals import words_changed
+
+        inserted = sum(self.counts.values())
+        with transaction.atomic(using=self.using):
+            self.resolve_languages({record['language'] for record in records})
+            self.resolve_word_classes({
+                (entry['class'], entry['abbr']) for record in records for entry in record['entries']
+            })
+            self.resolve_tags({tag for record in records for entry in record['entries'] for tag in entry['tags']})
+            self.resolve_inflection_tags({
+                tag for record in records for inflection in record['inflections'] for tag in inflection['tags']
+            })
+            words, existing = self.resolve_words(records)
+            existing_ids = [pk for pk, _ in existing]
+
+            known_entries = set(self.objects(Entry).filter(word_id__in=existing_ids).values_list(
+                'word_id', 'word_class_id', 'paraphrase'
+            ))
+            known_accents = set(self.objects(Accent).filter(word_id__in=existing_ids).values_list('word_id', 'ipa'))
+            known_inflections = set(self.objects(Inflection).filter(word_id__in=existing_ids).values_list(
+                'word_id', 'transcript'
+            ))
+            entries, entry_records, accents, inflections, inflection_tags = [], [], [], [], []
+
+            for record in records:
+                language = self.languages[record['language']]
+                word_id = words[record['language'], record['word']]
+
+                for ipa in record['accents']:
+                    if (word_id, ipa) not in known_accents:
+                        known_accents.add((word_id, ipa))
+                        accents.append(Accent(word_id=word_id, ipa=ipa))
+
+                for item in record['inflections']:
+                    if (word_id, item['transcript']) not in known_inflections:
+                        known_inflections.add((word_id, item['transcript']))
+                        inflections.append(Inflection(
+                            word_id=word_id,
+                            transcript=item['transcript'],
+                            unicode=item['unicode'],
+                            search_key=language.fold(item['transcript']),
+                        ))
+                        inflection_tags.append(item['tags'])
+
+                for item in record['entries']:
+                    key = (word_id, self.word_classes[item['class']], item['paraphrase'])
+                    if key in known_entries:
+                        continue
+                    known_entries.add(key)
+                    entries.append(Entry(
+                        word_id=word_id,
+                        word_class_id=key[1],
+                        paraphrase=item['paraphrase'],
+                        note=item['note'],
+                        search_key=language.fold(item['paraphrase']),
+                    ))
+                    entry_records.append((item, language))
+
+            self.insert(Accent, accents)
+            self.insert(Inflection, inflections)
+            self.objects(Inflection.tags.through).bulk_create([
+                Inflection.tags.through(inflection_id=inflection.pk, inflectiontag_id=self.inflection_tags[tag])
+                for inflection, tags in zip(inflections, inflection_tags) for tag in dict.fromkeys(tags)
+            ], batch_size=self.batch_size)
+            self.insert(Entry, entries)
+            self.insert(ExampleSentence, [
+                ExampleSentence(
+                    entry_id=entry.pk,
+                    transcript=example['transcript'],
+                    unicode=example['unicode'],
+                    note=example['note'],
+                    search_key=language.fold(example['transcript']),
+                )
+                for entry, (item, language) in zip(entries, entry_records) for example in item['examples']
+            ])
+            self.objects(Entry.tags.through).bulk_create([
+                Entry.tags.through(entry_id=entry.pk, objecttag_id=self.tags[tag])
+                for entry, (item, _) in zip(entries, entry_records) for tag in dict.fromkeys(item['tags'])
+            ], batch_size=self.batch_size)
+
+            changed = {row.word_id for rows in (entries, accents, inflections) for row in rows}
+            words_changed({(pk, transcript) for pk, transcript in existing if pk in changed}, using=self.using)
+            self.count(words, existing_ids, entry_records)
+            # New rows may show in any search, not only on pages of words
+            # which existed.
+            if sum(self.counts.values()) > inserted:
+                transaction.on_commit(pages.bump_lexicon_version, using=self.using)
+
+        self.counts['records'] += len(records)
+
+    def run(self, records):
+        """
+        Load all records, yielding the running counts after each chunk.
+        """
+        for chunk in chunks(records, self.batch_size):
+            self.load(chunk)
+            yield self.counts
+
+        indexes.invalidate_all()
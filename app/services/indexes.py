@@ -0,0 +1,105 @@
+from threading import RLock
+
+from django.core.cache import cache
+
+from app.services.normalization import fold
+
+GENERATION_KEY = 'word-indexes:generation'
+
+
+class WordIndex:
+    """
+    Base class of the in-memory word indexes kept for each language.
+
+    Subclasses index (pk, search key, transcript) rows, and must support
+    incremental add() and remove() so they can follow Word signals.
+    """
+
+    def __init__(self, rules, rows=()):
+        self.rules = rules
+        self.words = {pk: (key, transcript) for pk, key, transcript in rows}
+
+    def fold(self, text):
+        return fold(text, self.rules)
+
+    def add(self, pk, key, transcript):
+        raise NotImplementedError
+
+    def remove(self, pk):
+        raise NotImplementedError
+
+
+def invalidate_all():
+    """
+    Make every process rebuild its indexes at next use.
+
+    Signals keep the indexes of the process making a change up to date;
+    this covers changes bypassing signals, such as bulk imports.
+    """
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, None)
+
+
+class LanguageIndexes:
+    """
+    Registry of one WordIndex per language, built lazily at first use.
+    """
+
+    def __init__(self, index_class):
+        self.index_class = index_class
+        self.lock = RLock()
+        self.indexes = None
+        self.generation = None
+
+    def ready(self):
+        """
+        Tell whether get() can answer without building, thus without
+        touching the database.
+        """
+        return self.indexes is not None and self.generation == cache.get(GENERATION_KEY, 0)
+
+    def get(self):
+        generation = cache.get(GENERATION_KEY, 0)
+        if self.indexes is None or self.generation != generation:
+            with self.lock:
+                if self.indexes is None or self.generation != generation:
+                    self.indexes = self.build()
+                    self.generation = generation
+        return self.indexes
+
+    def build(self):
+        from app.models import Language, Word
+
+        languages = dict(Language.objects.values_list('pk', 'transliteration'))
+        rows = {pk: [] for pk in languages}
+        words = Word.objects.values_list('language_id', 'pk', 'search_key', 'transcript')
+
+        for language_id, *row in words.iterator(chunk_size=10000):
+            rows[language_id].append(row)
+        return {pk: self.index_class(rules, rows[pk]) for pk, rules in languages.items()}
+
+    def word_saved(self, pk, language_id, key, transcript):
+        if self.indexes is None:
+            return
+        with self.lock:
+            for index_language_id, index in self.indexes.items():
+                if index_language_id == language_id:
+                    index.add(pk, key, transcript)
+                else:
+                    index.remove(pk)
+
+    def word_deleted(self, pk):
+        if self.indexes is None:
+            return
+        with self.lock:
+            for index in self.indexes.values():
+                index.remove(pk)
+
+    def reset(self):
+        """
+        Drop all indexes. They will be rebuilt at next use.
+        """
+        with self.lock:
+            self.indexes = None
@@ -0,0 +1,160 @@
+"""
+Per-request performance metrics: SQL query count and time, template render
+time and total time, aggregated per view for the /metrics endpoint.
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+
+from django.template.backends.django import DjangoTemplates
+
+current = ContextVar('metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = perf_counter()
+        self.total = 0.0
+        self.queries = []
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        # Async views may run queries of a request in several threads.
+        self.lock = Lock()
+
+    def add_query(self, sql, duration):
+        with self.lock:
+            self.db_time += duration
+            self.queries.append((sql, duration))
+
+    @contextmanager
+    def rendering(self):
+        """
+        Time a template render. Templates rendered from within another one
+        are part of the outer render, so only the outermost is counted.
+        """
+        started = perf_counter()
+        self.template_depth += 1
+        try:
+            yield
+        finally:
+            self.template_depth -= 1
+            if not self.template_depth:
+                self.template_time += perf_counter() - started
+
+    def finish(self):
+        self.total = perf_counter() - self.started
+
+    def server_timing(self):
+        return ', '.join((
+            'db;dur=%.1f;desc="%s queries"' % (self.db_time * 1000, len(self.queries)),
+            'tpl;dur=%.1f' % (self.template_time * 1000),
+            'total;dur=%.1f' % (self.total * 1000),
+        ))
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper timing queries run for the current request.
+    """
+    metrics = current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, perf_counter() - started)
+
+
+def instrument(sender, connection, **kwargs):
+    """
+    Install record_query on new database connections.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        metrics = current.get()
+        if metrics is None:
+            return self.template.render(context, request)
+        with metrics.rendering():
+            return self.template.render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    Django template backend recording render times in the request metrics.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+class Registry:
+    """
+    Totals of the metrics of every view served by this process.
+    """
+    series = (
+        ('request_seconds', 'Time spent serving requests, in seconds.'),
+        ('db_queries', 'SQL queries run per request.'),
+        ('db_seconds', 'Time spent in SQL queries, in seconds.'),
+        ('template_seconds', 'Time spent rendering templates, in seconds.'),
+    )
+
+    def __init__(self):
+        self.lock = Lock()
+        self.views = defaultdict(lambda: {'count': 0, 'over_budget': 0, **{name: 0.0 for name, _ in self.series}})
+
+    def record(self, view, metrics, over_budget=False):
+        with self.lock:
+            totals = self.views[view]
+            totals['count'] += 1
+            totals['over_budget'] += over_budget
+            totals['request_seconds'] += metrics.total
+            totals['db_queries'] += len(metrics.queries)
+            totals['db_seconds'] += metrics.db_time
+            totals['template_seconds'] += metrics.template_time
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+
+    def exposition(self):
+        """
+        Render the totals in the Prometheus text format.
+        """
+        with self.lock:
+            views = sorted((view, dict(totals)) for view, totals in self.views.items())
+
+        lines = []
+        for name, description in self.series:
+            lines += ['# HELP dictator_%s %s' % (name, description), '# TYPE dictator_%s summary' % name]
+            for view, totals in views:
+                lines.append('dictator_%s_sum{view="%s"} %s' % (name, view, totals[name]))
+                lines.append('dictator_%s_count{view="%s"} %s' % (name, view, totals['count']))
+
+        lines += [
+            '# HELP dictator_budget_exceeded_total Requests exceeding their view budget.',
+            '# TYPE dictator_budget_exceeded_total counter',
+        ]
+        for view, totals in views:
+            lines.append('dictator_budget_exceeded_total{view="%s"} %s' % (view, totals['over_budget']))
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
@@ -0,0 +1,81 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+from django.core.cache import cache
+
+RULES_KEY = 'languages:transliteration'
+
+
+@lru_cache(maxsize=None)
+def compile_rules(rules):
+    """
+    Compile transliteration rules into a single longest-match pattern.
+
+    Rules are given as a tuple of (source, replacement) pairs.
+    """
+    if not rules:
+        return None, {}
+
+    table = {normalize(source): normalize(target) for source, target in rules if source}
+    pattern = re.compile('|'.join(
+        re.escape(source) for source in sorted(table, key=len, reverse=True)
+    ))
+    return pattern, table
+
+
+def normalize(text):
+    return unicodedata.normalize('NFC', text.casefold())
+
+
+def fold(text, rules=None):
+    """
+    Fold a text into its search key.
+
+    The text is case-folded and the language's transliteration rules are
+    applied, e.g. {'cx': 'ĉ'} for the Esperanto x-system. The result is then
+    NFKD-decomposed with combining marks stripped, so 'Ĉapelo', 'cxapelo' and
+    'capelo' all share the key 'capelo'.
+    """
+    text = normalize(text)
+    pattern, table = compile_rules(tuple(sorted((rules or {}).items())))
+
+    if pattern is not None:
+        text = pattern.sub(lambda match: table[match.group()], text)
+
+    return ''.join(
+        char for char in unicodedata.normalize('NFKD', text)
+        if not unicodedata.combining(char)
+    )
+
+
+def language_rules():
+    """
+    Return the non-empty transliteration rules of all languages.
+
+    They are kept in the cache until a language changes, so searches do not
+    read the language table.
+    """
+    from app.models import Language
+
+    rules = cache.get(RULES_KEY)
+    if rules is None:
+        rules = list(Language.objects.exclude(transliteration={}).values_list('transliteration', flat=True))
+        cache.set(RULES_KEY, rules, None)
+    return rules
+
+
+def forget_language_rules():
+    cache.delete(RULES_KEY)
+
+
+def query_keys(value):
+    """
+    Fold a search query with the rules of every language.
+
+    Return the distinct, non-empty keys, so one lookup covers all languages.
+    """
+    keys = {fold(value)}
+    for rules in language_rules():
+        keys.add(fold(value, rules))
+    return sorted(key for key in keys if key)
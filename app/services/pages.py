@@ -0,0 +1,135 @@
+from hashlib import md5
+from time import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+LEXICON_VERSION_KEY = 'lexicon:version'
+
+
+def get_cache():
+    return caches[settings.WORD_PAGE_CACHE]
+
+
+def page_key(name):
+    """
+    Cache key of a word page.
+
+    Word pages are addressed by transcript, so that is what keys them.
+    """
+    return 'word-page:%s' % md5(name.encode()).hexdigest()
+
+
+def settling_key(name):
+    return 'word-page-settling:%s' % md5(name.encode()).hexdigest()
+
+
+def word_etag(name):
+    """
+    ETag of a word page, derived from the versions of the words it shows.
+
+    This is a single lookup on the (transcript, version) index. Return None
+    if no word has that transcript.
+    """
+    from app.models import Word
+
+    versions = Word.objects.filter(transcript=name).order_by('pk').values_list('pk', 'version')
+    if not versions:
+        return None
+    return quote_etag('-'.join('%s.%s' % version for version in versions))
+
+
+def cached_response(request, name):
+    """
+    Serve a word page from the cache, without touching the database.
+
+    Return None on a miss.
+    """
+    page = get_cache().get(page_key(name))
+    return page and page_response(request, page)
+
+
+def cached_page(request, name, render):
+    """
+    Serve a word page from the cache, rendering and storing it on a miss.
+
+    `render` is called without arguments and returns the response. Only
+    successful responses of names which are a word's transcript are cached:
+    pages of inflected forms are left out, as changes to their words do not
+    invalidate them. Conditional requests are answered with 304 when the
+    page has not changed, without rendering it.
+
+    With read replicas, pages invalidated less than REPLICA_LAG seconds ago
+    are rendered but not stored, as the replica may still show the word as
+    it was before the change.
+    """
+    cache = get_cache()
+    key = page_key(name)
+    found = cache.get_many([key, settling_key(name)])
+    page = found.get(key)
+
+    if page is None:
+        etag = word_etag(name)
+        if etag is not None:
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                return not_modified
+
+        response = render()
+        if response.status_code != 200:
+            return response
+
+        page = {
+            'content': response.content,
+            'content_type': response['Content-Type'],
+            'etag': etag,
+            'last_modified': int(time()),
+        }
+        if etag is not None and settling_key(name) not in found:
+            cache.set(key, page, settings.WORD_PAGE_CACHE_TIMEOUT)
+
+    return page_response(request, page)
+
+
+def page_response(request, page):
+    response = HttpResponse(page['content'], content_type=page['content_type'])
+    # Pages of inflected forms have no word version to tag.
+    if page['etag'] is not None:
+        response['ETag'] = page['etag']
+    response['Last-Modified'] = http_date(page['last_modified'])
+
+    return get_conditional_response(
+        request, etag=page['etag'], last_modified=page['last_modified'], response=response
+    )
+
+
+def invalidate(*names):
+    cache = get_cache()
+    cache.delete_many([page_key(name) for name in names])
+    if settings.DATABASE_REPLICAS:
+        cache.set_many({settling_key(name): True for name in names}, settings.REPLICA_LAG)
+
+
+def lexicon_version():
+    return get_cache().get_or_set(LEXICON_VERSION_KEY, 0, None)
+
+
+def bump_lexicon_version():
+    """
+    Mark a change to any word, invalidating validators of pages such as
+    search results, which may show any word.
+    """
+    cache = get_cache()
+    try:
+        cache.incr(LEXICON_VERSION_KEY)
+    except ValueError:
+        cache.set(LEXICON_VERSION_KEY, 1, None)
+
+
+def search_etag(request, *args, **kwargs):
+    return quote_etag('%s-%s' % (
+        lexicon_version(), md5(request.get_full_path().encode()).hexdigest()
+    ))
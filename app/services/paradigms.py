@@ -0,0 +1,260 @@
+"""
+Inflection paradigms: inflections generated from the ParadigmRules of an
+inflection class, for every word with an entry in the class's range of
+word classes.
+"""
+import re
+from collections import Counter
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Exists, Max, OuterRef, Prefetch
+
+from app.models import Entry, InflectionClass, Inflection, Language, ParadigmRule, Word
+from app.services.importer import bulk_insert, insert_rows
+
+
+class ParadigmError(ValueError):
+    pass
+
+
+def compile_rule(rule):
+    """
+    Return a function forming the rule's inflection of a word, which
+    returns None if the rule does not apply to the word.
+    """
+    match, value = rule.match, rule.value
+
+    if rule.kind == ParadigmRule.SUFFIX:
+        def inflect(lemma):
+            if lemma.endswith(match):
+                return lemma[:len(lemma) - len(match)] + value
+    elif rule.kind == ParadigmRule.PREFIX:
+        def inflect(lemma):
+            if lemma.startswith(match):
+                return value + lemma[len(match):]
+    elif rule.kind == ParadigmRule.REPLACE:
+        try:
+            pattern = re.compile(match)
+        except re.error as ex:
+            raise ParadigmError("Rule %s: invalid regular expression '%s': %s." % (rule.pk, match, ex)) from ex
+        try:
+            # The replacement is parsed, and its group references checked, on
+            # substitution, even of an empty text.
+            pattern.sub(value, '')
+        except re.error as ex:
+            raise ParadigmError("Rule %s: invalid replacement '%s': %s." % (rule.pk, value, ex)) from ex
+
+        def inflect(lemma):
+            form, count = pattern.subn(value, lemma, count=1)
+            if count:
+                return form
+    else:
+        raise ParadigmError("Rule %s: unknown kind '%s'." % (rule.pk, rule.kind))
+
+    return inflect
+
+
+class Paradigm:
+    """
+    The compiled rules of an inflection class, grouped by tag combination.
+    """
+
+    def __init__(self, inflection_class):
+        self.inflection_class = inflection_class
+        self.word_classes = [word_class.pk for word_class in inflection_class.range.all()]
+
+        slots = {}
+        for rule in inflection_class.rules.all():
+            tags = tuple(sorted(tag.pk for tag in rule.tags.all()))
+            slots.setdefault(tags, []).append((rule.language_id, compile_rule(rule)))
+        self.slots = list(slots.items())
+
+    def __str__(self):
+        return str(self.inflection_class)
+
+    def inflect(self, lemma, language_id):
+        """
+        Return (form, tag ids) pairs of the inflections of a word: for every
+        tag combination, the form of the first rule applying to the word.
+        """
+        forms = []
+        for tags, rules in self.slots:
+            for rule_language_id, inflect in rules:
+                if rule_language_id is None or rule_language_id == language_id:
+                    form = inflect(lemma)
+                    if form:
+                        forms.append((form, tags))
+                        break
+        return forms
+
+
+def paradigms(names=None, using=DEFAULT_DB_ALIAS):
+    """
+    Return the paradigms of the inflection classes having rules, optionally
+    only those of the named classes.
+    """
+    classes = InflectionClass.objects.using(using).filter(rules__isnull=False).distinct().prefetch_related(
+        'range', Prefetch('rules', queryset=ParadigmRule.objects.prefetch_related('tags'))
+    ).order_by('pk')
+    if names is not None:
+        classes = classes.filter(name__in=names)
+    return [Paradigm(inflection_class) for inflection_class in classes]
+
+
+class ParadigmGenerator:
+    """
+    Bulk generator of the inflections of paradigms.
+
+    Words in the range of a class are read in keyset-paginated chunks and
+    inflected in memory. Each chunk is written in its own transaction with a
+    fixed number of queries: forms the class generated before are compared
+    with the new ones, and only the words whose forms changed get theirs
+    replaced, with bulk inserts of plain rows. Regenerating unchanged
+    paradigms therefore only reads.
+
+    Typed-in inflections are kept, and forms they already provide are not
+    generated again. Generated forms are folded into search keys with the
+    rules of their word's language, like typed-in ones. Cards of changed
+    words are dropped, to be built again when first read.
+    """
+
+    def __init__(self, batch_size=1000, using=DEFAULT_DB_ALIAS):
+        self.batch_size = batch_size
+        self.using = using
+        self.counts = Counter()
+        self.languages = {}
+
+    def objects(self, model):
+        return model.objects.using(self.using)
+
+    def fold(self, language_id, text):
+        if language_id not in self.languages:
+            self.languages = {language.pk: language for language in self.objects(Language)}
+        return self.languages[language_id].fold(text)
+
+    def insert(self, inflection_class, forms):
+        """
+        Insert (word id, transcript, search key) forms generated by the class,
+        returning their primary keys.
+
+        Backends which cannot return primary keys from bulk inserts (like
+        SQLite) get them allocated past the current maximum, as in
+        bulk_insert(), and the rows written without building instances.
+        """
+        if connections[self.using].features.can_return_rows_from_bulk_insert:
+            inflections = [
+                Inflection(word_id=pk, transcript=transcript, search_key=key, generated_by=inflection_class)
+                for pk, transcript, key in forms
+            ]
+            bulk_insert(Inflection, inflections, self.batch_size, self.using)
+            return [inflection.pk for inflection in inflections]
+
+        start = (self.objects(Inflection).aggregate(last=Max('pk'))['last'] or 0) + 1
+        pks = range(start, start + len(forms))
+        insert_rows(Inflection, ('id', 'word', 'transcript', 'unicode', 'search_key', 'generated_by'), [
+            (pk, word_id, transcript, '', key, inflection_class.pk)
+            for pk, (word_id, transcript, key) in zip(pks, forms)
+        ], self.using)
+        return pks
+
+    def remove(self, inflections):
+        """
+        Delete generated inflections, with their tags.
+
+        The per-row page signals are skipped; callers report the words to
+        words_changed instead.
+        """
+        from app.signals import bulk_changes
+
+        with bulk_changes():
+            _, deleted = inflections.delete()
+        self.counts['removed'] += deleted.get(Inflection._meta.label, 0)
+
+    def remove_stale(self, paradigm):
+        """
+        Delete the forms of words which left the range of the class.
+        """
+        from app.signals import words_changed
+
+        stale = self.objects(Inflection).filter(generated_by=paradigm.inflection_class).exclude(
+            word__entries__word_class__in=paradigm.word_classes
+        )
+        with transaction.atomic(using=self.using):
+            words = set(stale.values_list('word_id', 'word__transcript').distinct())
+            if words:
+                self.remove(stale)
+                words_changed(words, rebuild=False, using=self.using)
+
+    def load(self, paradigm, words):
+        """
+        Generate the inflections of a chunk of (pk, transcript, language id)
+        words, in primary key order, in a single transaction.
+        """
+        from app.signals import words_changed
+
+        inflection_class = paradigm.inflection_class
+        # The chunk's rows are looked up by its range of word ids, as
+        # parameter lists as long as the chunk are costly to build.
+        first, last = words[0][0], words[-1][0]
+
+        with transaction.atomic(using=self.using):
+            generated = self.objects(Inflection).filter(
+                generated_by=inflection_class, word_id__gte=first, word_id__lte=last
+            )
+            tags = {}
+            for inflection_id, tag_id in self.objects(Inflection.tags.through).filter(
+                inflection__generated_by=inflection_class, inflection__word_id__gte=first, inflection__word_id__lte=last
+            ).values_list('inflection_id', 'inflectiontag_id'):
+                tags.setdefault(inflection_id, []).append(tag_id)
+
+            old = {pk: set() for pk, _, _ in words}
+            for pk, word_id, transcript in generated.values_list('pk', 'word_id', 'transcript'):
+                old[word_id].add((transcript, tuple(sorted(tags.get(pk, ())))))
+            typed = set(self.objects(Inflection).filter(
+                word_id__gte=first, word_id__lte=last, generated_by=None
+            ).values_list(
+                'word_id', 'transcript'
+            ))
+
+            new, changed = [], set()
+            for pk, transcript, language_id in words:
+                forms = {form for form in paradigm.inflect(transcript, language_id) if (pk, form[0]) not in typed}
+                if forms != old[pk]:
+                    new += [(pk, language_id, form) for form in forms]
+                    changed.add((pk, transcript))
+
+            if changed:
+                if len(changed) < len(words):
+                    generated = generated.filter(word_id__in=[pk for pk, _ in changed])
+                self.remove(generated)
+                inflection_ids = self.insert(inflection_class, [
+                    (pk, transcript, self.fold(language_id, transcript)) for pk, language_id, (transcript, _) in new
+                ])
+                insert_rows(Inflection.tags.through, ('inflection', 'inflectiontag'), [
+                    (inflection_id, tag_id)
+                    for inflection_id, (_, _, (_, tag_ids)) in zip(inflection_ids, new) for tag_id in tag_ids
+                ], self.using)
+                self.counts['inflections'] += len(inflection_ids)
+                words_changed(changed, rebuild=False, using=self.using)
+
+        self.counts['words'] += len(words)
+
+    def run(self, paradigms):
+        """
+        Generate the inflections of the paradigms, yielding the running counts
+        after each chunk.
+        """
+        for paradigm in paradigms:
+            self.remove_stale(paradigm)
+            words = self.objects(Word).filter(Exists(self.objects(Entry).filter(
+                word=OuterRef('pk'), word_class__in=paradigm.word_classes
+            ))).order_by('pk').values_list('pk', 'transcript', 'language_id')
+
+            last = 0
+            while True:
+                chunk = list(words.filter(pk__gt=last)[:self.batch_size])
+                if not chunk:
+                    break
+                self.load(paradigm, chunk)
+                last = chunk[-1][0]
+                yield self.counts
@@ -0,0 +1,146 @@
+"""
+Language presets: versioned JSON data files, each describing a language and
+a few words in the record format of app.services.formats::
+
+    {
+        "code": "epo",
+        "version": 1,
+        "source": "Where the data comes from.",
+        "language": {"name": "Esperanto", "description": "...", "tags": [], "transliteration": {}},
+        "words": [{"word": "kordo", "entries": [...]}]
+    }
+
+Presets are discovered from the directories in settings.PRESET_DIRS. The
+checksum of every applied file is recorded, so applying a preset again is
+a no-op unless its file changed.
+"""
+import json
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from app.models import AppliedPreset, Language, ObjectTag
+from app.services.formats import record
+from app.services.importer import DictionaryImporter
+
+
+class PresetError(ValueError):
+    pass
+
+
+class Preset:
+    def __init__(self, path):
+        self.path = Path(path)
+        content = self.path.read_bytes()
+        self.checksum = sha256(content).hexdigest()
+
+        try:
+            data = json.loads(content)
+            self.code = data['code']
+            self.version = int(data['version'])
+            self.source = data.get('source', '')
+            self.language = data['language']
+            self.name = self.language['name']
+            self.records = [
+                record(
+                    self.name, item['word'], item.get('unicode'), item.get('accents') or (), item.get('entries') or ()
+                )
+                for item in data.get('words') or ()
+            ]
+        except (ValueError, KeyError, TypeError) as ex:
+            raise PresetError('%s: %s' % (self.path.name, ex)) from ex
+
+    def __str__(self):
+        return self.name
+
+
+def discover(directories=None):
+    """
+    Return the presets found in the given directories, keyed by code.
+    """
+    presets = {}
+    for directory in directories if directories is not None else settings.PRESET_DIRS:
+        for path in sorted(Path(directory).glob('*.json')):
+            preset = Preset(path)
+            presets[preset.code] = preset
+    return presets
+
+
+def is_applied(preset, using=DEFAULT_DB_ALIAS):
+    return AppliedPreset.objects.using(using).filter(code=preset.code, checksum=preset.checksum).exists()
+
+
+def apply(preset, batch_size=1000, using=DEFAULT_DB_ALIAS):
+    """
+    Apply a preset in a single transaction, returning the importer counts.
+
+    Words are loaded by the bulk importer, which skips what already exists,
+    so a newer version of a preset only adds what it gained.
+    """
+    with transaction.atomic(using=using):
+        language, _ = Language.objects.using(using).update_or_create(name=preset.name, defaults={
+            'description': preset.language.get('description', ''),
+            'transliteration': preset.language.get('transliteration') or {},
+        })
+        for name in preset.language.get('tags') or ():
+            tag, _ = ObjectTag.objects.using(using).get_or_create(name=name, model=Language.__name__)
+            language.tags.add(tag)
+
+        importer = DictionaryImporter(batch_size, using)
+        importer.languages[language.name] = language
+        for _ in importer.run(preset.records):
+            pass
+
+        AppliedPreset.objects.using(using).update_or_create(code=preset.code, defaults={
+            'version': preset.version,
+            'checksum': preset.checksum,
+        })
+    return importer.counts
+
+
+def prepare(presets, using=DEFAULT_DB_ALIAS):
+    """
+    Create the word classes and entry tags shared by the presets, so that
+    presets applied concurrently do not race to create them.
+    """
+    records = [item for preset in presets for item in preset.records]
+    importer = DictionaryImporter(using=using)
+    with transaction.atomic(using=using):
+        importer.resolve_word_classes({
+            (entry['class'], entry['abbr']) for item in records for entry in item['entries']
+        })
+        importer.resolve_tags({tag for item in records for entry in item['entries'] for tag in entry['tags']})
+
+
+def apply_all(presets, jobs=1, using=DEFAULT_DB_ALIAS):
+    """
+    Apply presets, up to `jobs` of them concurrently, yielding (preset,
+    counts) pairs in order.
+
+    SQLite allows a single writer, so presets are applied one at a time on
+    it regardless of `jobs`.
+    """
+    presets = list(presets)
+    if connections[using].vendor == 'sqlite':
+        jobs = 1
+    if not presets:
+        return
+
+    prepare(presets, using)
+    if jobs == 1:
+        for preset in presets:
+            yield preset, apply(preset, using=using)
+        return
+
+    def work(preset):
+        # Worker threads have their own connections, closed once done.
+        try:
+            return apply(preset, using=using)
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        yield from zip(presets, executor.map(work, presets))
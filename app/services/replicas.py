@@ -0,0 +1,88 @@
+"""
+Read replica routing.
+
+Reads of the views named in REPLICA_VIEWS (search, word pages, exports) go
+to one of the DATABASE_REPLICAS, picked once per request so that all reads
+of a request see the same replica. Everything else reads from, and all
+writes go to, the primary ('default') database: management commands,
+the admin, and the tables of other applications such as sessions.
+
+Replicas lag behind the primary. Once a request writes, its remaining
+reads go to the primary, and ReplicaMiddleware pins the client to the
+primary for the next REPLICA_LAG seconds, so editors read their own
+writes.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_reads = ContextVar('replica_reads', default=None)
+
+
+class Reads:
+    """
+    Routing state of a request.
+    """
+
+    def __init__(self, pinned=False):
+        self.replica = None
+        self.pinned = pinned
+        self.wrote = False
+
+    def use_replica(self):
+        if settings.DATABASE_REPLICAS and not self.pinned:
+            self.replica = random.choice(settings.DATABASE_REPLICAS)
+
+    @property
+    def database(self):
+        if self.pinned or self.wrote:
+            return None
+        return self.replica
+
+
+@contextmanager
+def reads(pinned=False):
+    """
+    Route the reads within the block, as those of a request.
+
+    Reads go to the primary until use_replica() is called on the yielded
+    state, and again once anything is written.
+    """
+    token = _reads.set(Reads(pinned))
+    try:
+        yield _reads.get()
+    finally:
+        _reads.reset(token)
+
+
+def current():
+    """
+    Return the routing state of the current request, or None.
+    """
+    return _reads.get()
+
+
+class ReplicaRouter:
+    """
+    Database router sending reads of this application's models to the
+    replica chosen for the request.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _reads.get()
+        if state is None or model._meta.app_label != 'app':
+            return None
+        return state.database
+
+    def db_for_write(self, model, **hints):
+        state = _reads.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
@@ -0,0 +1,198 @@
+import asyncio
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import namedtuple
+from functools import reduce
+from heapq import merge
+from itertools import islice
+from operator import itemgetter, or_
+
+from django.conf import settings
+from django.db.models import Case, When, Value, IntegerField, F, Q
+
+from app.models import Word, Inflection, Entry, ExampleSentence
+from app.services import fts
+from app.services.aio import database
+from app.services.normalization import query_keys
+
+WORD, ENTRY, SENTENCE = range(3)
+
+ORDERING = ('rank', 'kind', 'key')
+
+SearchPage = namedtuple('SearchPage', ('results', 'next_cursor'))
+
+Form = namedtuple('Form', ('word', 'headword', 'transcript', 'tags'))
+
+
+class Cursor(namedtuple('Cursor', ('rank', 'kind', 'key', 'served'))):
+    """
+    Position of the last result served, used for keyset pagination.
+
+    Results are ordered by (rank, kind, key), so the next page starts right
+    after this tuple. `served` counts results served so far, so the overall
+    result cap holds across pages.
+    """
+
+    def encode(self):
+        raw = '.'.join(str(field) for field in self).encode()
+        return urlsafe_b64encode(raw).decode().rstrip('=')
+
+    @classmethod
+    def decode(cls, token):
+        """
+        Decode a cursor token. Return None if the token is malformed.
+        """
+        try:
+            raw = urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+            return cls(*(int(field) for field in raw.split('.')))
+        except (ValueError, TypeError):
+            return None
+
+
+def rank(keys):
+    """
+    Rank a match: 0 for an exact match, 1 for a prefix match, 2 otherwise.
+    """
+    return Case(
+        When(search_key__in=keys, then=Value(0)),
+        When(reduce(or_, (Q(search_key__startswith=key) for key in keys)), then=Value(1)),
+        default=Value(2),
+        output_field=IntegerField(),
+    )
+
+
+def after(cursor, kind):
+    """
+    Filter for results of a kind which come after the cursor.
+    """
+    if cursor is None:
+        return Q()
+    if kind < cursor.kind:
+        return Q(rank__gt=cursor.rank)
+    if kind > cursor.kind:
+        return Q(rank__gte=cursor.rank)
+    return Q(rank__gt=cursor.rank) | Q(rank=cursor.rank, key__gt=cursor.key)
+
+
+def lookup(queryset, kind, field, headword, keys, cursor):
+    return queryset.filter(fts.contains(queryset.model, 'search_key', keys)).annotate(
+        rank=rank(keys),
+        kind=Value(kind, output_field=IntegerField()),
+        key=F('pk'),
+        text=F(field),
+        headword=F(headword),
+    ).filter(after(cursor, kind)).values('rank', 'kind', 'key', 'text', 'headword')
+
+
+def queries(keys, cursor):
+    """
+    Return the word, paraphrase and sentence queries of a search.
+    """
+    return (
+        lookup(Word.objects, WORD, 'transcript', 'transcript', keys, cursor),
+        lookup(
+            Entry.objects.exclude(fts.contains(Word, 'search_key', keys, prefix='word__')),
+            ENTRY, 'paraphrase', 'word__transcript', keys, cursor
+        ),
+        lookup(
+            ExampleSentence.objects.exclude(fts.contains(Word, 'search_key', keys, prefix='entry__word__')),
+            SENTENCE, 'transcript', 'entry__word__transcript', keys, cursor
+        ),
+    )
+
+
+def page_bounds(cursor, page_size):
+    """
+    Return the number of results served before this page, and its size.
+    """
+    limit = settings.SEARCH_RESULT_LIMIT
+    served = cursor.served if cursor is not None else 0
+    return served, min(page_size or settings.SEARCH_PAGE_SIZE, limit - served)
+
+
+def paginate(results, served, page_size):
+    """
+    Cut ordered results, fetched one past the page size, into a page.
+    """
+    next_cursor = None
+
+    if len(results) > page_size:
+        results = results[:page_size]
+        last = results[-1]
+        if served + page_size < settings.SEARCH_RESULT_LIMIT:
+            next_cursor = Cursor(last['rank'], last['kind'], last['key'], served + page_size)
+
+    return SearchPage(results, next_cursor)
+
+
+def search(value, cursor=None, page_size=None):
+    """
+    Search words, paraphrases and example sentences in a single ranked query.
+
+    The value is folded into search keys, so matching ignores case,
+    diacritics and the spelling variants of each language. Substring
+    matching goes through the full text index where available.
+
+    Paraphrases and sentences belonging to a matching word are left out, as
+    the word itself is already a result. Results are ordered by rank and kind,
+    paginated with a cursor, and capped at SEARCH_RESULT_LIMIT overall.
+    """
+    served, page_size = page_bounds(cursor, page_size)
+    keys = query_keys(value)
+
+    if page_size <= 0 or not keys:
+        return SearchPage([], None)
+
+    words, entries, sentences = queries(keys, cursor)
+    results = list(
+        words.union(entries, sentences, all=True).order_by(*ORDERING)[:page_size + 1]
+    )
+    return paginate(results, served, page_size)
+
+
+async def asearch(value, cursor=None, page_size=None):
+    """
+    Search like search(), from async code.
+
+    With ASYNC_PARALLEL_QUERIES, the word, paraphrase and sentence queries
+    run concurrently, and their ordered results are merged.
+    """
+    if not settings.ASYNC_PARALLEL_QUERIES:
+        return await database(search)(value, cursor, page_size)
+
+    served, page_size = page_bounds(cursor, page_size)
+    keys = await database(query_keys)(value)
+
+    if page_size <= 0 or not keys:
+        return SearchPage([], None)
+
+    fetch = database(list)
+    parts = await asyncio.gather(*(
+        fetch(query.order_by(*ORDERING)[:page_size + 1]) for query in queries(keys, cursor)
+    ))
+    results = list(islice(merge(*parts, key=itemgetter(*ORDERING)), page_size + 1))
+    return paginate(results, served, page_size)
+
+
+def find_forms(value):
+    """
+    Resolve a surface form to the words it is an inflection of.
+
+    The value is folded like a search, and matched exactly against the
+    search keys of inflections, typed-in and generated alike, with a single
+    indexed lookup joined to the words and tags. Return Forms holding the
+    word's pk, its transcript, the inflection's transcript and its tag
+    names, ordered by headword.
+    """
+    keys = query_keys(value)
+    if not keys:
+        return []
+
+    rows = Inflection.objects.filter(search_key__in=keys).order_by('word__transcript', 'pk', 'tags__pk').values_list(
+        'pk', 'word_id', 'word__transcript', 'transcript', 'tags__name'
+    )
+    forms = {}
+    for pk, word_id, headword, transcript, tag in rows:
+        form = forms.setdefault(pk, Form(word_id, headword, transcript, []))
+        if tag is not None:
+            form.tags.append(tag)
+    return list(forms.values())
@@ -0,0 +1,55 @@
+from bisect import bisect_left, insort
+from itertools import takewhile
+
+from app.services.indexes import WordIndex, LanguageIndexes
+
+
+class PrefixIndex(WordIndex):
+    """
+    In-memory index of the words of a language, sorted by search key.
+
+    Prefix queries are a binary search followed by a short scan, so they do
+    not touch the database once the index is built.
+    """
+
+    def __init__(self, rules, rows=()):
+        super().__init__(rules, rows)
+        self.entries = sorted((key, transcript, pk) for pk, (key, transcript) in self.words.items())
+
+    def add(self, pk, key, transcript):
+        self.remove(pk)
+        self.words[pk] = (key, transcript)
+        insort(self.entries, (key, transcript, pk))
+
+    def remove(self, pk):
+        if pk not in self.words:
+            return
+        key, transcript = self.words.pop(pk)
+        index = bisect_left(self.entries, (key, transcript, pk))
+        del self.entries[index]
+
+    def prefix(self, key, limit):
+        start = bisect_left(self.entries, (key,))
+        return list(takewhile(
+            lambda entry: entry[0].startswith(key), self.entries[start:start + limit]
+        ))
+
+
+indexes = LanguageIndexes(PrefixIndex)
+
+
+def suggest(value, languages=None, limit=10):
+    """
+    Return up to `limit` words whose search keys start with the folded value,
+    as (language_id, transcript) pairs ordered by search key.
+    """
+    matches = []
+
+    for language_id, index in indexes.get().items():
+        if languages is None or language_id in languages:
+            key = index.fold(value)
+            if key:
+                matches += [(entry, language_id) for entry in index.prefix(key, limit)]
+
+    matches.sort()
+    return [(language_id, transcript) for (_, transcript, _), language_id in matches[:limit]]
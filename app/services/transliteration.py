@@ -0,0 +1,171 @@
+"""
+Transliteration of transcripts into the script of a GlyphSet.
+
+Each glyph with a transcript maps that Latin spelling to its unicode text.
+The table of a glyph set is compiled into a single regular expression
+shaped like a trie of the spellings, so a text is converted in one pass
+from left to right, taking the longest spelling at each position. Matching
+ignores case: texts are case-folded first, and characters no glyph
+spells are kept in that form.
+"""
+import re
+from collections import Counter
+from functools import lru_cache
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from app.models import Glyph, Inflection, Orthography, Word, ExampleSentence
+from app.services.normalization import normalize
+
+# Marks the end of a spelling in a trie node
+END = ''
+
+
+class TransliterationError(ValueError):
+    pass
+
+
+def trie_pattern(spellings):
+    """
+    Return a pattern matching the longest of the spellings at a position.
+
+    Branches of a trie node start with distinct characters, so at most one
+    of them goes on; the rest of a spelling which is also a prefix of others
+    is optional and greedy, so longer spellings are tried first.
+    """
+    trie = {}
+    for spelling in spellings:
+        node = trie
+        for char in spelling:
+            node = node.setdefault(char, {})
+        node[END] = True
+
+    def branches(node):
+        alternatives = []
+        for char, child in sorted((char, child) for char, child in node.items() if char != END):
+            rest = branches(child)
+            if rest:
+                rest = '(?:%s)%s' % (rest, '?' if END in child else '')
+            alternatives.append(re.escape(char) + rest)
+        return '|'.join(alternatives)
+
+    return branches(trie)
+
+
+@lru_cache(maxsize=None)
+def compile_table(table):
+    """
+    Compile a transliteration table, given as a tuple of (spelling, text)
+    pairs, into a pattern and a lookup of matched spellings.
+    """
+    table = {normalize(spelling): text for spelling, text in table if spelling}
+    if not table:
+        return None, {}
+    return re.compile(trie_pattern(table)), table
+
+
+class Transliterator:
+    def __init__(self, table):
+        self.pattern, self.table = compile_table(tuple(sorted(table.items())))
+
+    def __call__(self, text):
+        text = normalize(text)
+        if self.pattern is None:
+            return text
+        return self.pattern.sub(lambda match: self.table[match.group()], text)
+
+
+def transliterator(glyph_set, using=DEFAULT_DB_ALIAS):
+    """
+    Return the transliterator of a glyph set.
+
+    Raise TransliterationError if none of its glyphs has a transcript.
+    """
+    table = dict(Glyph.objects.using(using).filter(glyph_set=glyph_set).exclude(transcript='').values_list(
+        'transcript', 'unicode'
+    ))
+    if not table:
+        raise TransliterationError("Glyph set '%s' has no glyphs with a transcript." % glyph_set.name)
+    return Transliterator(table)
+
+
+def language_glyph_set(language, using=DEFAULT_DB_ALIAS):
+    """
+    Return the glyph set of the language's orthography.
+
+    Raise TransliterationError unless exactly one is linked to the language.
+    """
+    orthographies = Orthography.objects.using(using).filter(language=language, glyph_set__isnull=False)
+    glyph_sets = list({orthography.glyph_set for orthography in orthographies.select_related('glyph_set')})
+    if len(glyph_sets) != 1:
+        raise TransliterationError("Language '%s' has %s glyph sets; name the one to use." % (
+            language.name, len(glyph_sets) or 'no'
+        ))
+    return glyph_sets[0]
+
+
+class UnicodeBackfill:
+    """
+    Bulk filler of the unicode texts of a language's words, inflections and
+    example sentences, transliterated from their transcripts.
+
+    Rows are read in keyset-paginated chunks, and the changed ones written
+    with bulk_update, a transaction per chunk. Only rows without a unicode
+    text are filled, unless `overwrite` is set. Changed words get their
+    versions bumped and their cards dropped, to be built again when first
+    read.
+    """
+
+    # Lookup path from each model to its word
+    sources = (
+        (Word, ''),
+        (Inflection, 'word__'),
+        (ExampleSentence, 'entry__word__'),
+    )
+
+    def __init__(self, transliterate, overwrite=False, batch_size=1000, using=DEFAULT_DB_ALIAS):
+        self.transliterate = transliterate
+        self.overwrite = overwrite
+        self.batch_size = batch_size
+        self.using = using
+        self.counts = Counter()
+
+    def load(self, model, rows):
+        """
+        Transliterate a chunk of (pk, transcript, unicode, word pk, word
+        transcript) rows in a single transaction.
+        """
+        from app.signals import words_changed
+
+        changed, words = [], set()
+        for pk, transcript, unicode, word_id, headword in rows:
+            text = self.transliterate(transcript)
+            if text != unicode:
+                changed.append(model(pk=pk, unicode=text))
+                words.add((word_id, headword))
+
+        with transaction.atomic(using=self.using):
+            model.objects.using(self.using).bulk_update(changed, ['unicode'], batch_size=self.batch_size)
+            words_changed(words, rebuild=False, using=self.using)
+
+        self.counts[str(model._meta.verbose_name_plural)] += len(changed)
+
+    def run(self, language):
+        """
+        Fill the unicode texts of the language, yielding the running counts
+        after each chunk.
+        """
+        for model, path in self.sources:
+            rows = model.objects.using(self.using).filter(**{path + 'language': language})
+            if not self.overwrite:
+                rows = rows.filter(unicode='')
+            rows = rows.order_by('pk').values_list('pk', 'transcript', 'unicode', path + 'pk', path + 'transcript')
+
+            last = 0
+            while True:
+                chunk = list(rows.filter(pk__gt=last)[:self.batch_size])
+                if not chunk:
+                    break
+                self.load(model, chunk)
+                last = chunk[-1][0]
+                yield self.counts
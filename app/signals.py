@@ -0,0 +1,227 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils.timezone import now
+
+from app.apps import AppConfig
+from app.models import (
+    Application, Language, LanguageStats, ObjectTag, Word, WordCard, WordClass, Accent, InflectionTag, Inflection,
+    Entry, ExampleSentence
+)
+from app.services import cards, catalog, fuzzy, metrics, normalization, pages, suggest
+
+word_indexes = (suggest.indexes, fuzzy.indexes)
+
+connection_created.connect(metrics.instrument)
+
+
+@receiver(post_save, sender=Application)
+def application_saved(sender, instance, **kwargs):
+    transaction.on_commit(lambda: AppConfig.set_application(instance))
+
+
+@receiver(post_delete, sender=Application)
+def application_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: AppConfig.set_application(None))
+
+# Lookup path from each model to the word whose page shows it
+word_pages = {
+    Word: '',
+    Accent: 'word__',
+    Inflection: 'word__',
+    Entry: 'word__',
+    ExampleSentence: 'entry__word__',
+}
+
+
+@receiver(post_save, sender=Word)
+def word_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    values = (instance.pk, instance.language_id, instance.search_key, instance.transcript)
+
+    for indexes in word_indexes:
+        transaction.on_commit(lambda indexes=indexes: indexes.word_saved(*values))
+
+
+@receiver(post_delete, sender=Word)
+def word_deleted(sender, instance, **kwargs):
+    pk = instance.pk
+
+    for indexes in word_indexes:
+        transaction.on_commit(lambda indexes=indexes: indexes.word_deleted(pk))
+
+
+@receiver(post_save, sender=Language)
+def language_saved(sender, instance, created, raw=False, using=None, **kwargs):
+    if created and not raw:
+        LanguageStats.objects.using(using).create(language=instance)
+
+
+@receiver(post_save, sender=Language)
+@receiver(post_delete, sender=Language)
+def language_changed(sender, instance, **kwargs):
+    for indexes in word_indexes:
+        transaction.on_commit(indexes.reset)
+    transaction.on_commit(normalization.forget_language_rules)
+
+
+def affected_words(queryset, path):
+    return set(queryset.values_list(path + 'pk', path + 'transcript').distinct())
+
+
+def words_changed(words, bump=True, rebuild=True, using=DEFAULT_DB_ALIAS):
+    """
+    Bump the versions and modification times of changed words, drop their
+    cards and invalidate their pages. Cards are rebuilt once committed,
+    unless `rebuild` is false; bulk jobs leave them to be built when first
+    read.
+
+    `words` is a set of (pk, transcript) pairs of the `using` database.
+    """
+    if not words:
+        return
+    pks = {pk for pk, _ in words}
+    if bump:
+        Word.objects.using(using).filter(pk__in=pks).update(version=F('version') + 1, modified=now())
+    WordCard.objects.using(using).filter(pk__in=pks).delete()
+
+    transcripts = {transcript for _, transcript in words}
+    if rebuild:
+        transaction.on_commit(lambda: cards.refresh(pks, using), using=using)
+    transaction.on_commit(lambda: pages.invalidate(*transcripts), using=using)
+    transaction.on_commit(pages.bump_lexicon_version, using=using)
+
+
+# Set while bulk jobs change rows, reporting the words themselves
+_bulk_changes = ContextVar('bulk_changes', default=False)
+
+
+@contextmanager
+def bulk_changes():
+    """
+    Skip the per-row page signals within the block. Callers report the
+    changed words to words_changed instead.
+    """
+    token = _bulk_changes.set(True)
+    try:
+        yield
+    finally:
+        _bulk_changes.reset(token)
+
+
+def page_source_changing(sender, instance, raw=False, **kwargs):
+    """
+    Remember the word showing a row before it changes, in case the change
+    moves the row to another word or renames the word.
+    """
+    if not raw and not _bulk_changes.get() and instance.pk is not None:
+        instance._affected_words = affected_words(sender.objects.filter(pk=instance.pk), word_pages[sender])
+
+
+def page_source_changed(sender, instance, raw=False, **kwargs):
+    if raw or _bulk_changes.get():
+        return
+    words = affected_words(sender.objects.filter(pk=instance.pk), word_pages[sender])
+    # Word.save() bumps its own version
+    words_changed(words | getattr(instance, '_affected_words', set()), bump=sender is not Word)
+
+
+def page_source_tags_changed(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear') or _bulk_changes.get():
+        return
+    if not reverse:
+        words = affected_words(type(instance).objects.filter(pk=instance.pk), 'word__')
+    elif action == 'pre_clear':
+        words = affected_words(model.objects.filter(tags=instance), 'word__')
+    else:
+        words = affected_words(model.objects.filter(pk__in=pk_set), 'word__')
+    words_changed(words)
+
+
+for page_source in word_pages:
+    pre_save.connect(page_source_changing, sender=page_source)
+    post_save.connect(page_source_changed, sender=page_source)
+    pre_delete.connect(page_source_changing, sender=page_source)
+    post_delete.connect(page_source_changed, sender=page_source)
+
+m2m_changed.connect(page_source_tags_changed, sender=Entry.tags.through)
+m2m_changed.connect(page_source_tags_changed, sender=Inflection.tags.through)
+
+
+@receiver(post_save, sender=WordClass)
+def word_class_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        words_changed(affected_words(Word.objects.filter(entries__word_class=instance), ''))
+
+# Lookup from words to each kind of tag their cards show
+tagged_words = {
+    ObjectTag: 'entries__tags',
+    InflectionTag: 'inflection__tags',
+}
+
+
+def tagged(sender, instance):
+    return affected_words(Word.objects.filter(**{tagged_words[sender]: instance}), '')
+
+
+def tag_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        words_changed(tagged(sender, instance))
+
+
+def tag_deleting(sender, instance, **kwargs):
+    # The tag's links are gone once it is deleted.
+    instance._affected_words = tagged(sender, instance)
+
+
+def tag_deleted(sender, instance, **kwargs):
+    words_changed(instance._affected_words)
+
+
+for tag_model in tagged_words:
+    post_save.connect(tag_saved, sender=tag_model)
+    pre_delete.connect(tag_deleting, sender=tag_model)
+    post_delete.connect(tag_deleted, sender=tag_model)
+
+
+def counted_language(sender, pk, using):
+    return sender.objects.using(using).filter(pk=pk).values_list(catalog.sources[sender][1], flat=True).first()
+
+
+def counted_row_changing(sender, instance, raw=False, using=None, **kwargs):
+    """
+    Remember the language of a row before it changes or is deleted.
+    """
+    if not raw and instance.pk is not None:
+        instance._counted_language = counted_language(sender, instance.pk, using)
+
+
+def counted_row_saved(sender, instance, created, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    field = catalog.sources[sender][0]
+    language_id = instance.language_id if sender is Word else counted_language(sender, instance.pk, using)
+    previous = getattr(instance, '_counted_language', None)
+
+    if created:
+        catalog.adjust(language_id, using, **{field: 1})
+    elif previous != language_id:
+        # Rows below the moved one moved as well.
+        catalog.recount({previous, language_id}, using)
+
+
+def counted_row_deleted(sender, instance, using=None, **kwargs):
+    catalog.adjust(getattr(instance, '_counted_language', None), using, **{catalog.sources[sender][0]: -1})
+
+
+for counted_model in catalog.sources:
+    pre_save.connect(counted_row_changing, sender=counted_model)
+    post_save.connect(counted_row_saved, sender=counted_model)
+    pre_delete.connect(counted_row_changing, sender=counted_model)
+    post_delete.connect(counted_row_deleted, sender=counted_model)
@@ -1,6 +1,6 @@
 from django import template
 from django.template.defaulttags import TemplateIfParser
-from django.utils.html import format_html
+from django.utils.safestring import mark_safe
 
 register = template.Library()
 
@@ -11,7 +11,6 @@ class TeleportNode(template.Node):
     def __init__(self, nodelist, condition_portals):
         self.nodelist = nodelist
         self.condition_portals = condition_portals
-        self.match = None
 
     @staticmethod
     def get_portals(context):
@@ -19,16 +18,16 @@ class TeleportNode(template.Node):
             TeleportNode.context_key, {}
         )
 
-    def evaluate(self, condition, context):
-        if condition is not None:
-            try:
-                self.match = condition.eval(context)
-            except template.VariableDoesNotExist:
-                self.match = None
-        else:
-            self.match = True
-
-        return self.match
+    @staticmethod
+    def evaluate(condition, context):
+        # Nodes are shared by every render of a cached template, so the
+        # outcome stays local to this render.
+        if condition is None:
+            return True
+        try:
+            return condition.eval(context)
+        except template.VariableDoesNotExist:
+            return None
 
     def render(self, context):
         for condition, portal_name in self.condition_portals:
@@ -47,14 +46,10 @@ class TeleportNode(template.Node):
                     raise template.TemplateSyntaxError(
                         'Teleport tag must come before portal tag.'
                     )
-                target.append(self.nodelist)
-                break
+                target.append(self.nodelist.render(context))
+                return ''
 
-        if not self.match:
-            output = self.nodelist.render(context)
-            return output
-
-        return ''
+        return self.nodelist.render(context)
 
 
 @register.tag('teleport')
@@ -91,6 +86,9 @@ def do_teleport(parser, token):
             ...
         {% endteleport %}
 
+    The snippet is rendered where the teleport tag stands, with the context
+    there, and its output is inserted at the portal.
+
     Teleport tag needs a portal tag to work, and it MUST precede the latter::
 
         {% portal 'header' %}
@@ -166,13 +164,10 @@ def portal(context, portal_name):
     """
     portals = TeleportNode.get_portals(context)
     this_portal = portals.get(portal_name)
-    results = ''
 
     if this_portal is None:
         portals[portal_name] = None
-        return results
-
-    for nodelist in this_portal:
-        results += nodelist.render(context)
+        return ''
 
-    return format_html(results)
+    # Fragments are rendered output, already escaped.
+    return mark_safe(''.join(this_portal))
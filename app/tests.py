@@ -1,3 +1,1428 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import re
+from contextlib import contextmanager
+from datetime import timedelta
+from io import BytesIO, StringIO
+from tempfile import TemporaryDirectory
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.contrib.auth.models import User
+from django.db import DatabaseError, connection, connections, router
+from django.db.models import QuerySet
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.template import engines
+from django.urls import reverse
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+
+from app.apps import AppConfig
+from app.middleware import compression
+from app.benchmarks import generator, suite as benchmark_suite
+from app.models import (
+    Application, AppliedPreset, Language, WordClass, Word, WordCard, Accent, Entry, ExampleSentence, ObjectTag,
+    InflectionClass, InflectionTag, Inflection, ParadigmRule, Font, GlyphSet, Glyph, Orthography, LanguageStats
+)
+from app.services import aio, cards, catalog, fonts, formats, fts, fuzzy, metrics, pages, replicas, suggest
+from app.services.exporter import export_words
+from app.services.importer import DictionaryImporter
+from app.services.normalization import fold, language_rules
+from app.services.paradigms import ParadigmGenerator, paradigms
+from app.services.search import Cursor, Form, asearch, find_forms, search, WORD, ENTRY
+from app.services.transliteration import Transliterator, UnicodeBackfill
+
+
+@contextmanager
+def temporary_database(alias):
+    """
+    Register a migrated SQLite file under the alias, past the test runner's
+    setup, and drop it on exit.
+    """
+    directory = TemporaryDirectory()
+    connections.databases[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(directory.name, 'db.sqlite3'),
+    }
+    try:
+        call_command('migrate', database=alias, verbosity=0)
+        yield connections[alias]
+    finally:
+        connections[alias].close()
+        del connections[alias]
+        del connections.databases[alias]
+        fts._installed.pop(alias, None)
+        directory.cleanup()
+
+
+def build_font(path, text):
+    """
+    Write a TrueType font drawing each character of the text as a square.
+    """
+    from fontTools.fontBuilder import FontBuilder
+    from fontTools.pens.ttGlyphPen import TTGlyphPen
+
+    glyphs = {'uni%04X' % ord(char): ord(char) for char in text}
+    names = ['.notdef'] + list(glyphs)
+    pen = TTGlyphPen(None)
+    pen.moveTo((0, 0))
+    pen.lineTo((0, 500))
+    pen.lineTo((500, 500))
+    pen.lineTo((500, 0))
+    pen.closePath()
+
+    builder = FontBuilder(1000, isTTF=True)
+    builder.setupGlyphOrder(names)
+    builder.setupCharacterMap({code: name for name, code in glyphs.items()})
+    builder.setupGlyf({name: pen.glyph() for name in names})
+    builder.setupHorizontalMetrics({name: (600, 0) for name in names})
+    builder.setupHorizontalHeader(ascent=800, descent=-200)
+    builder.setupNameTable({'familyName': 'Sitelen', 'styleName': 'Regular'})
+    builder.setupOS2()
+    builder.setupPost()
+    builder.save(path)
+
+
+@override_settings(VIEW_BUDGETS={}, ASYNC_PARALLEL_QUERIES=False)
+class DictionaryTestCase(TestCase):
+    """
+    Test case with the application set up and empty caches. View budgets
+    are lifted, as cold caches make requests go over them, and async views
+    query through the test's connection.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        Application.objects.create(name='dictator')
+
+    def setUp(self):
+        cache.clear()
+        AppConfig.update()
+
+
+class WordPageTestCase(DictionaryTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.language = Language.objects.create(name='Esperanto')
+        cls.word_classes = [
+            WordClass.objects.create(name='Noun', abbr='n'),
+            WordClass.objects.create(name='Verb', abbr='v'),
+        ]
+        cls.tag = ObjectTag.objects.create(model='Entry', name='Muziko')
+        cls.inflection_tag = InflectionTag.objects.create(
+            clss=InflectionClass.objects.create(name='Plural'), name='pl'
+        )
+
+    def create_word(self, transcript, entry_count):
+        word = Word.objects.create(language=self.language, transcript=transcript)
+        Accent.objects.create(word=word, ipa=transcript)
+        Inflection.objects.create(word=word, transcript=transcript + 'j').tags.add(self.inflection_tag)
+
+        for i in range(entry_count):
+            entry = Entry.objects.create(
+                word=word, word_class=self.word_classes[i % 2], paraphrase='paraphrase %s' % i
+            )
+            entry.tags.add(self.tag)
+            ExampleSentence.objects.create(entry=entry, transcript='example %s' % i)
+        return word
+
+    def test_name_redirects_to_transcript_in_any_case(self):
+        self.create_word('Ĉapelo', 1)
+        self.create_word('capelo', 1)
+
+        self.assertRedirects(self.client.get('/word/ĈAPELO'), '/word/%C4%88apelo', fetch_redirect_response=False)
+        self.assertRedirects(self.client.get('/word/CAPELO'), '/word/capelo', fetch_redirect_response=False)
+        self.assertEqual(self.client.get('/word/CAPELOJ').status_code, 200)
+
+    def count_queries(self, name):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/word/%s' % name)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_word_page_renders_entries(self):
+        self.create_word('kordo', 3)
+        response = self.client.get('/word/kordo')
+
+        self.assertContains(response, 'paraphrase 2')
+        self.assertContains(response, 'example 1')
+        self.assertContains(response, '/kordo/')
+        self.assertContains(response, 'Verb')
+
+    def test_word_page_query_count_is_constant(self):
+        self.create_word('mi', 1)
+        self.create_word('polvo', 500)
+
+        self.assertEqual(self.count_queries('mi'), self.count_queries('polvo'))
+
+    def test_built_card_is_a_single_read(self):
+        self.create_word('kordo', 3)
+        self.client.get('/word/kordo')
+        cache.clear()
+
+        # The page's ETag lookup, then its card.
+        self.assertEqual(self.count_queries('kordo'), 2)
+
+    def test_card_is_rebuilt_on_change(self):
+        word = self.create_word('kordo', 1)
+        self.client.get('/word/kordo')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Entry.objects.filter(word=word).first().examples.create(transcript='example new')
+        self.assertIn('example new', str(WordCard.objects.get(pk=word.pk).document))
+        self.assertContains(self.client.get('/word/kordo'), 'example new')
+
+    def test_card_follows_tag_changes(self):
+        word = self.create_word('kordo', 1)
+        self.client.get('/word/kordo')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag.name = 'Muzikado'
+            self.tag.save()
+            self.inflection_tag.name = 'plural'
+            self.inflection_tag.save()
+        document = WordCard.objects.get(pk=word.pk).document
+        self.assertEqual(document['entry_groups'][0]['list'][0]['tags'], [{'name': 'Muzikado'}])
+        self.assertEqual(document['inflections'][0]['tags'], [{'name': 'plural'}])
+
+        version = Word.objects.get(pk=word.pk).version
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag.delete()
+        self.assertEqual(Word.objects.get(pk=word.pk).version, version + 1)
+        self.assertEqual(WordCard.objects.get(pk=word.pk).document['entry_groups'][0]['list'][0]['tags'], [])
+
+    def test_missing_cards_of_shared_transcript(self):
+        word = self.create_word('kordo', 1)
+        Word.objects.create(language=Language.objects.create(name='Ido'), transcript='kordo')
+        WordCard.objects.all().delete()
+
+        self.assertContains(self.client.get('/word/kordo'), 'paraphrase 0')
+        self.assertEqual(WordCard.objects.count(), 2)
+        self.assertEqual(cards.get_card('kordo')['pk'], word.pk)
+
+    def test_concurrent_card_build(self):
+        word = self.create_word('kordo', 1)
+        bulk_create = QuerySet.bulk_create
+
+        def built_meanwhile(queryset, objects, **kwargs):
+            WordCard.objects.create(word=word, document={})
+            return bulk_create(queryset, objects, **kwargs)
+
+        with mock.patch.object(QuerySet, 'bulk_create', built_meanwhile):
+            self.assertEqual(cards.refresh({word.pk})[word.pk]['transcript'], 'kordo')
+        self.assertEqual(WordCard.objects.count(), 1)
+
+    def test_rebuild_command(self):
+        self.create_word('kordo', 2)
+        self.create_word('mi', 1)
+        call_command('rebuild_word_cards', '--batch-size', '1', verbosity=0)
+
+        self.assertEqual(WordCard.objects.count(), 2)
+
+
+class SearchTestCase(DictionaryTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        language = Language.objects.create(name='Esperanto')
+        noun = WordClass.objects.create(name='Noun', abbr='n')
+
+        for transcript in ('kordo', 'kordoj', 'akordo'):
+            Word.objects.create(language=language, transcript=transcript)
+        for i in range(30):
+            word = Word.objects.create(language=language, transcript='vorto%s' % i)
+            entry = Entry.objects.create(word=word, word_class=noun, paraphrase='Muzika kordo %s' % i)
+            ExampleSentence.objects.create(entry=entry, transcript='La kordo %s' % i)
+
+    def collect(self, value, **kwargs):
+        results, cursor = [], None
+        while True:
+            page = search(value, cursor, **kwargs)
+            results += page.results
+            if page.next_cursor is None:
+                return results
+            cursor = Cursor.decode(page.next_cursor.encode())
+
+    def test_results_are_ranked(self):
+        results = search('kordo').results
+        self.assertEqual(
+            [(r['kind'], r['text']) for r in results[:3]],
+            [(WORD, 'kordo'), (WORD, 'kordoj'), (WORD, 'akordo')]
+        )
+        self.assertEqual(results[3]['kind'], ENTRY)
+
+    @override_settings(SEARCH_RESULT_LIMIT=1000)
+    def test_cursor_pagination_covers_all_results(self):
+        results = self.collect('kordo', page_size=7)
+        keys = [(r['kind'], r['key']) for r in results]
+
+        self.assertEqual(len(results), 3 + 30 + 30)
+        self.assertEqual(len(keys), len(set(keys)))
+
+    @override_settings(SEARCH_RESULT_LIMIT=10)
+    def test_results_are_capped(self):
+        self.assertEqual(len(self.collect('kordo', page_size=4)), 10)
+
+    def test_words_deleted_while_searching(self):
+        get_cards = cards.get_cards
+
+        def deleted_meanwhile(pks):
+            Word.objects.filter(transcript='kordoj').delete()
+            return get_cards(pks)
+
+        with mock.patch.object(cards, 'get_cards', deleted_meanwhile):
+            response = self.client.get('/search', {'w': 'kordo'})
+        self.assertEqual([word['transcript'] for word in response.context['results']['words']], ['kordo', 'akordo'])
+
+    def test_search_page(self):
+        response = self.client.get('/search', {'w': 'kordo'})
+
+        self.assertContains(response, 'Muzika kordo 0')
+        self.assertContains(response, 'More results')
+
+
+class SearchIndexTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.language = Language.objects.create(name='Esperanto')
+
+    def matches(self, value):
+        return list(Word.objects.filter(
+            fts.contains(Word, 'search_key', [fold(value)])
+        ).values_list('transcript', flat=True))
+
+    def test_index_is_installed(self):
+        self.assertTrue(fts.is_installed())
+        self.assertIn('MATCH', str(Word.objects.filter(fts.contains(Word, 'search_key', ['kord'])).query))
+
+    def test_index_follows_changes(self):
+        word = Word.objects.create(language=self.language, transcript='Akordo')
+        self.assertEqual(self.matches('KORD'), ['Akordo'])
+
+        word.transcript = 'polvo'
+        word.save()
+        self.assertEqual(self.matches('kord'), [])
+        self.assertEqual(self.matches('olv'), ['polvo'])
+
+        word.delete()
+        self.assertEqual(self.matches('olv'), [])
+
+    def test_unmigrating_drops_index(self):
+        with temporary_database('unmigrated') as unmigrated:
+            self.assertTrue(fts.is_installed('unmigrated'))
+
+            call_command('migrate', 'app', 'zero', database='unmigrated', verbosity=0)
+            self.assertNotIn(fts.fts_table(Word), unmigrated.introspection.table_names())
+            self.assertFalse(fts.is_installed('unmigrated'))
+
+    def test_rebuild(self):
+        Word.objects.bulk_create([Word(language=self.language, transcript='kordo')])
+        call_command('rebuild_search_index', verbosity=0)
+
+        self.assertTrue(fts.is_installed())
+        self.assertEqual(self.matches('ord'), ['kordo'])
+
+
+class SearchKeyTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.language = Language.objects.create(name='Esperanto', transliteration={
+            'cx': 'ĉ', 'gx': 'ĝ', 'hx': 'ĥ', 'jx': 'ĵ', 'sx': 'ŝ', 'ux': 'ŭ'
+        })
+        cls.word = Word.objects.create(language=cls.language, transcript='Ĉapelo')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_fold(self):
+        self.assertEqual(fold('Ĉapelo'), 'capelo')
+        self.assertEqual(fold('ŜTRASSE'), 'strasse')
+        self.assertEqual(fold('cxapelo', self.language.transliteration), 'capelo')
+        self.assertEqual(fold('CXapelo', self.language.transliteration), 'capelo')
+
+    def test_search_key_is_stored(self):
+        self.assertEqual(self.word.search_key, 'capelo')
+
+    def test_search_ignores_diacritics_and_x_system(self):
+        for value in ('ĉapelo', 'cxapelo', 'capelo', 'CAPEL'):
+            with self.subTest(value=value):
+                self.assertEqual([r['text'] for r in search(value).results], ['Ĉapelo'])
+
+
+class SuggestTestCase(DictionaryTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.language = Language.objects.create(name='Esperanto', transliteration={'cx': 'ĉ'})
+        for transcript in ('ĉapelo', 'ĉapo', 'ĉambro', 'kapo'):
+            Word.objects.create(language=cls.language, transcript=transcript)
+
+    def setUp(self):
+        super().setUp()
+        suggest.indexes.reset()
+
+    def transcripts(self, value, limit=10):
+        return [transcript for _, transcript in suggest.suggest(value, limit=limit)]
+
+    def test_prefix_matches(self):
+        self.assertEqual(self.transcripts('cxa'), ['ĉambro', 'ĉapelo', 'ĉapo'])
+        self.assertEqual(self.transcripts('ĉap'), ['ĉapelo', 'ĉapo'])
+        self.assertEqual(self.transcripts('ca', limit=1), ['ĉambro'])
+        self.assertEqual(self.transcripts('x'), [])
+
+    def test_index_follows_changes(self):
+        self.transcripts('c')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            word = Word.objects.create(language=self.language, transcript='ĉapitro')
+        self.assertIn('ĉapitro', self.transcripts('cap'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            word.transcript = 'kapitro'
+            word.save()
+        self.assertNotIn('ĉapitro', self.transcripts('cap'))
+        self.assertIn('kapitro', self.transcripts('kap'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            word.delete()
+        self.assertEqual(self.transcripts('kap'), ['kapo'])
+
+    def test_suggest_endpoint(self):
+        self.transcripts('c')
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/suggest', {'q': 'kap'})
+        self.assertEqual(response.json()['suggestions'], [{'transcript': 'kapo', 'url': '/word/kapo'}])
+
+
+class DidYouMeanTestCase(DictionaryTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        language = Language.objects.create(name='Esperanto')
+        for transcript in ('abomeno', 'kordo', 'klapo', 'perturbi', 'sagitala'):
+            Word.objects.create(language=language, transcript=transcript)
+
+    def setUp(self):
+        super().setUp()
+        fuzzy.indexes.reset()
+
+    def transcripts(self, value):
+        return [transcript for _, transcript in fuzzy.did_you_mean(value)]
+
+    def test_distance(self):
+        self.assertEqual(fuzzy.distance('kordo', 'kordo'), 0)
+        self.assertEqual(fuzzy.distance('kodro', 'kordo'), 1)
+        self.assertEqual(fuzzy.distance('krdoo', 'kordo'), 2)
+        self.assertEqual(fuzzy.distance('abc', 'kordo'), 3)
+
+    def test_suggestions(self):
+        self.assertEqual(self.transcripts('kodro'), ['kordo'])
+        self.assertEqual(self.transcripts('perturbiii'), ['perturbi'])
+        self.assertEqual(self.transcripts('Sagitalla'), ['sagitala'])
+        self.assertEqual(self.transcripts('klap'), ['klapo'])
+        self.assertEqual(self.transcripts('xyz'), [])
+
+    def test_word_not_found(self):
+        response = self.client.get('/word/kodro')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertContains(response, '/word/kordo', status_code=404)
+
+    def test_search_without_results(self):
+        self.assertContains(self.client.get('/search', {'w': 'abomenno'}), 'Did you mean')
+
+
+class WordPageCacheTestCase(DictionaryTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.noun = WordClass.objects.create(name='Noun', abbr='n')
+        cls.word = Word.objects.create(language=Language.objects.create(name='Esperanto'), transcript='kordo')
+        cls.entry = Entry.objects.create(word=cls.word, word_class=cls.noun, paraphrase='Fadeno')
+
+    def test_cached_page_skips_database(self):
+        first = self.client.get('/word/kordo')
+
+        with self.assertNumQueries(0):
+            second = self.client.get('/word/kordo')
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+
+    def test_conditional_get(self):
+        etag = self.client.get('/word/kordo')['ETag']
+        response = self.client.get('/word/kordo', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_invalidate_page(self):
+        self.client.get('/word/kordo')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ExampleSentence.objects.create(entry=self.entry, transcript='La arĉo kuradis')
+        self.assertContains(self.client.get('/word/kordo'), 'La arĉo kuradis')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.noun.name = 'Substantive'
+            self.noun.save()
+        self.assertContains(self.client.get('/word/kordo'), 'Substantive')
+
+    def test_renaming_invalidates_old_page(self):
+        self.client.get('/word/kordo')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.word.transcript = 'akordo'
+            self.word.save()
+        self.assertEqual(self.client.get('/word/kordo').status_code, 404)
+
+
+class WordVersionTestCase(DictionaryTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.noun = WordClass.objects.create(name='Noun', abbr='n')
+        cls.word = Word.objects.create(language=Language.objects.create(name='Esperanto'), transcript='kordo')
+
+    def version(self):
+        return Word.objects.get(pk=self.word.pk).version
+
+    def test_dependent_changes_bump_version(self):
+        entry = Entry.objects.create(word=self.word, word_class=self.noun, paraphrase='Fadeno')
+        self.assertEqual(self.version(), 1)
+
+        ExampleSentence.objects.create(entry=entry, transcript='La arĉo kuradis')
+        Accent.objects.create(word=self.word, ipa='kordo')
+        entry.tags.add(ObjectTag.objects.create(model='Entry', name='Muziko'))
+        self.assertEqual(self.version(), 4)
+
+        self.word.save()
+        self.word.save()
+        self.assertEqual(self.word.version, 6)
+        self.assertEqual(self.version(), 6)
+
+    def test_not_modified_without_rendering(self):
+        etag = self.client.get('/word/kordo')['ETag']
+        cache.clear()
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/word/kordo', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Accent.objects.create(word=self.word, ipa='kordo')
+        cache.clear()
+        self.assertEqual(self.client.get('/word/kordo', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_search_validators(self):
+        etag = self.client.get('/search', {'w': 'kordo'})['ETag']
+        self.assertEqual(self.client.get('/search', {'w': 'kordo'}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Accent.objects.create(word=self.word, ipa='kordo')
+        self.assertEqual(self.client.get('/search', {'w': 'kordo'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+@override_settings(VIEW_BUDGETS={}, ASYNC_PARALLEL_QUERIES=True)
+class AsyncViewsTestCase(TransactionTestCase):
+    """
+    Async views served through ASGI, with queries in worker threads, which
+    only see committed data.
+    """
+
+    def setUp(self):
+        cache.clear()
+        Application.objects.create(name='dictator')
+        language = Language.objects.create(name='Esperanto')
+        noun = WordClass.objects.create(name='Noun', abbr='n')
+        for index in range(30):
+            word = Word.objects.create(language=language, transcript='kordo%02d' % index)
+            entry = Entry.objects.create(word=word, word_class=noun, paraphrase='Fadeno de kordo')
+            ExampleSentence.objects.create(entry=entry, transcript='Kordoj %s' % index)
+        AppConfig.update()
+
+    async def test_parallel_search_matches_union(self):
+        cursor = None
+        while True:
+            page = await asearch('kordo', cursor)
+            self.assertEqual(page, await sync_to_async(search)('kordo', cursor))
+            if page.next_cursor is None:
+                break
+            cursor = page.next_cursor
+
+    async def test_views(self):
+        client = AsyncClient()
+
+        # This Django's AsyncClient drops query dicts of GET requests and
+        # takes extra headers by their HTTP names.
+        response = await client.get('/search?w=kordo')
+        self.assertContains(response, 'kordo07')
+        self.assertEqual((await client.get('/search?w=kordo', **{'if-none-match': response['ETag']})).status_code, 304)
+
+        self.assertContains(await client.get('/word/kordo07'), 'Fadeno de kordo')
+        self.assertContains(await client.get('/word/kordo07'), 'Fadeno de kordo')
+        self.assertEqual(
+            json.loads((await client.get('/suggest?q=kordo2')).content)['suggestions'][0]['transcript'], 'kordo20'
+        )
+
+    async def test_export_streams(self):
+        # The test client does not iterate streams as ASGI servers do.
+        communicator = ApplicationCommunicator(aio.ASGIHandler(), {
+            'type': 'http', 'method': 'GET', 'path': '/library/Esperanto/export', 'query_string': b'',
+            'headers': [(b'host', b'testserver')],
+        })
+        await communicator.send_input({'type': 'http.request'})
+        messages = [await communicator.receive_output(5)]
+        while messages[-1].get('more_body', messages[-1]['type'] == 'http.response.start'):
+            messages.append(await communicator.receive_output(5))
+
+        self.assertEqual(messages[0]['status'], 200)
+        lines = b''.join(message.get('body', b'') for message in messages[1:]).decode().splitlines()
+        self.assertEqual([json.loads(line)['word'] for line in lines], ['kordo%02d' % index for index in range(30)])
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+class ReplicaTestCase(DictionaryTestCase):
+    """
+    Reads routed to two SQLite files standing in for read replicas, each
+    holding its own paraphrase of the word.
+    """
+    replicas = ('replica1', 'replica2')
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Registered past the test runner's setup, which only knows about the
+        # databases of the settings; the files go away with the test case.
+        cls.directory = TemporaryDirectory()
+        for alias in cls.replicas:
+            connections.databases[alias] = {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': os.path.join(cls.directory.name, '%s.sqlite3' % alias),
+            }
+            call_command('migrate', database=alias, verbosity=0)
+            cls.add_words(alias)
+
+    @classmethod
+    def tearDownClass(cls):
+        for alias in cls.replicas:
+            connections[alias].close()
+            del connections[alias]
+            del connections.databases[alias]
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.word = cls.add_words('default')
+
+    @staticmethod
+    def add_words(alias):
+        if alias != 'default':
+            Application.objects.using(alias).create(name='dictator')
+        language = Language.objects.using(alias).create(name='Esperanto')
+        noun = WordClass.objects.using(alias).create(name='Noun', abbr='n')
+        word = Word.objects.using(alias).create(language=language, transcript='kordo')
+        Entry.objects.using(alias).create(word=word, word_class=noun, paraphrase='Fadeno (%s)' % alias)
+        cards.refresh({word.pk}, using=alias)
+        return word
+
+    def test_router(self):
+        self.assertEqual(router.db_for_read(Word), 'default')
+
+        with replicas.reads() as state:
+            self.assertEqual(router.db_for_read(Word), 'default')
+            state.use_replica()
+            self.assertIn(router.db_for_read(Word), self.replicas)
+            self.assertEqual(router.db_for_read(User), 'default')
+
+            ObjectTag.objects.create(model='Entry', name='Muziko')
+            self.assertEqual(router.db_for_read(Word), 'default')
+
+    def test_views_read_from_replica(self):
+        self.assertContains(self.client.get('/word/kordo'), 'Fadeno (replica')
+        self.assertContains(self.client.get('/search?w=kordo'), 'Fadeno (replica')
+        self.assertIn(b'Fadeno (replica', b''.join(self.client.get('/library/Esperanto/export').streaming_content))
+        self.assertNotIn('primary', self.client.cookies)
+
+    def test_read_your_writes(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='admin'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/admin/app/word/%s/change/' % self.word.pk, {
+                'language': self.word.language_id, 'transcript': 'kordo', 'unicode': '',
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('primary', response.cookies)
+
+        # Pinned to the primary, and the changed page is not cached while
+        # replicas may still show the old one.
+        self.assertContains(self.client.get('/word/kordo'), 'Fadeno (default)')
+        self.assertIsNone(cache.get(pages.page_key('kordo')))
+
+
+class WordsApiTestCase(DictionaryTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        noun = WordClass.objects.create(name='Noun', abbr='n')
+        for name in ('Esperanto', 'Ido'):
+            language = Language.objects.create(name=name)
+            for transcript in ('kordo', 'arko', 'lingvo'):
+                word = Word.objects.create(language=language, transcript=transcript)
+                entry = Entry.objects.create(word=word, word_class=noun, paraphrase='%s (%s)' % (transcript, name))
+                ExampleSentence.objects.create(entry=entry, transcript='La %s' % transcript)
+                Inflection.objects.create(word=word, transcript=transcript + 'j')
+
+    def test_batch_is_a_single_query(self):
+        self.client.get('/api/v1/words?w=kordo&w=arko&w=lingvo')
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/words?w=kordo&w=arko&w=lingvo&w=nenio&w=kordo')
+        result = response.json()
+        self.assertEqual(list(result['words']), ['kordo', 'arko', 'lingvo'])
+        self.assertEqual(result['missing'], ['nenio'])
+        self.assertEqual([word['language'] for word in result['words']['kordo']], ['Esperanto', 'Ido'])
+
+    def test_post_with_language(self):
+        response = self.client.post(
+            '/api/v1/words', {'words': ['arko'], 'language': 'Ido'}, content_type='application/json'
+        )
+        self.assertEqual(response.json()['words']['arko'], [{
+            'language': 'Ido',
+            'transcript': 'arko',
+            'unicode': '',
+            'accents': [],
+            'entries': [{
+                'class': 'Noun',
+                'paraphrase': 'arko (Ido)',
+                'note': '',
+                'tags': [],
+                'examples': [{'transcript': 'La arko', 'unicode': '', 'note': ''}],
+            }],
+            'inflections': [{'transcript': 'arkoj', 'unicode': '', 'tags': []}],
+        }])
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.post('/api/v1/words', 'kordo', content_type='application/json').status_code, 400)
+        self.assertEqual(self.client.post(
+            '/api/v1/words', {'words': 'kordo'}, content_type='application/json'
+        ).status_code, 400)
+        with self.settings(API_BATCH_LIMIT=1):
+            self.assertEqual(self.client.get('/api/v1/words?w=kordo&w=arko').status_code, 400)
+
+    def test_compression(self):
+        url = '/api/v1/words?w=kordo&w=arko&w=lingvo'
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.content)), self.client.get(url).json())
+
+    @skipUnless(compression.brotli, 'brotli is not installed')
+    def test_brotli(self):
+        url = '/api/v1/words?w=kordo&w=arko&w=lingvo'
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(json.loads(compression.brotli.decompress(response.content)), self.client.get(url).json())
+
+
+class ParadigmTestCase(DictionaryTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        language = Language.objects.create(name='Esperanto')
+        noun = WordClass.objects.create(name='Noun', abbr='n')
+        verb = WordClass.objects.create(name='Verb', abbr='v')
+        cls.words = {}
+        for transcript, word_class in (('kordo', noun), ('arko', noun), ('kanti', verb)):
+            cls.words[transcript] = Word.objects.create(language=language, transcript=transcript)
+            Entry.objects.create(word=cls.words[transcript], word_class=word_class, paraphrase=transcript)
+
+        cls.nouns = InflectionClass.objects.create(name='O-nouns', note='')
+        cls.nouns.range.set([noun])
+        plural, accusative = [InflectionTag.objects.create(clss=cls.nouns, name=name, note='')
+                              for name in ('Plural', 'Accusative')]
+        for tags, kind, match, value in (
+            ([plural], ParadigmRule.SUFFIX, 'o', 'oj'),
+            ([accusative], ParadigmRule.SUFFIX, '', 'n'),
+            ([plural, accusative], ParadigmRule.REPLACE, 'o$', 'ojn'),
+            ([accusative], ParadigmRule.PREFIX, '', 'never'),
+        ):
+            ParadigmRule.objects.create(clss=cls.nouns, kind=kind, match=match, value=value).tags.set(tags)
+
+    def forms(self, transcript):
+        return sorted(
+            (inflection.transcript, sorted(tag.name for tag in inflection.tags.all()))
+            for inflection in Inflection.objects.filter(word=self.words[transcript])
+        )
+
+    def generate(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('generate_inflections', verbosity=0)
+
+    def test_generate(self):
+        self.generate()
+
+        self.assertEqual(self.forms('kordo'), [
+            ('kordoj', ['Plural']), ('kordojn', ['Accusative', 'Plural']), ('kordon', ['Accusative']),
+        ])
+        self.assertEqual(self.forms('kanti'), [])
+        self.assertIn('arkojn', [inflection['transcript'] for inflection in cards.get_card('arko')['inflections']])
+
+    def test_regenerate(self):
+        Inflection.objects.create(word=self.words['arko'], transcript='arkoj')
+        self.generate()
+        version = Word.objects.get(transcript='kordo').version
+
+        generator = ParadigmGenerator()
+        for _ in generator.run(paradigms()):
+            pass
+        self.assertEqual(generator.counts['inflections'], 0)
+        self.assertEqual(Word.objects.get(transcript='kordo').version, version)
+        self.assertEqual([form for form, _ in self.forms('arko')], ['arkoj', 'arkojn', 'arkon'])
+
+        ParadigmRule.objects.filter(value='oj').update(value='oj!')
+        Entry.objects.filter(word=self.words['arko']).update(word_class=WordClass.objects.get(name='Verb'))
+        self.generate()
+        self.assertEqual([form for form, _ in self.forms('kordo')], ['kordoj!', 'kordojn', 'kordon'])
+        self.assertEqual(self.forms('arko'), [('arkoj', [])])
+
+    def test_invalid_replacement(self):
+        rule = ParadigmRule(clss=self.nouns, kind=ParadigmRule.REPLACE, match='(o)$', value=r'\2')
+        with self.assertRaises(ValidationError) as raised:
+            rule.full_clean()
+        self.assertIn('value', raised.exception.message_dict)
+
+        rule.save()
+        errors = StringIO()
+        call_command('generate_inflections', stdout=StringIO(), stderr=errors)
+        self.assertIn('invalid replacement', errors.getvalue())
+        self.assertFalse(Inflection.objects.exists())
+
+    def test_chunk_queries_do_not_grow_with_words(self):
+        def count(batch_size):
+            with CaptureQueriesContext(connection) as queries:
+                for _ in ParadigmGenerator(batch_size).run(paradigms()):
+                    pass
+            Inflection.objects.all().delete()
+            return len(queries)
+
+        self.assertEqual(count(2), count(2))
+        self.assertLess(count(10), count(1))
+
+    def test_generate_on_other_database(self):
+        with temporary_database('other'):
+            language = Language.objects.using('other').create(name='Esperanto')
+            noun = WordClass.objects.using('other').create(name='Noun', abbr='n')
+            word = Word.objects.using('other').create(language=language, transcript='kordo')
+            Entry.objects.using('other').create(word=word, word_class=noun, paraphrase='Fadeno')
+            cards.refresh({word.pk}, using='other')
+            nouns = InflectionClass.objects.using('other').create(name='O-nouns', note='')
+            # Related managers write through the router, to the default database
+            InflectionClass.range.through.objects.using('other').create(inflectionclass=nouns, wordclass=noun)
+            ParadigmRule.objects.using('other').create(clss=nouns, kind=ParadigmRule.SUFFIX, match='o', value='oj')
+            versions = dict(Word.objects.values_list('pk', 'version'))
+
+            with self.captureOnCommitCallbacks(using='other', execute=True):
+                for _ in ParadigmGenerator(using='other').run(paradigms(using='other')):
+                    pass
+            self.assertEqual(Word.objects.using('other').get().version, word.version + 1)
+            self.assertFalse(WordCard.objects.using('other').exists())
+            self.assertEqual(dict(Word.objects.values_list('pk', 'version')), versions)
+
+    def test_forms_resolve_to_words(self):
+        self.generate()
+
+        self.assertEqual(find_forms('KORDOJN'), [
+            Form(self.words['kordo'].pk, 'kordo', 'kordojn', ['Plural', 'Accusative'])
+        ])
+        self.assertEqual(find_forms('kordo'), [])
+        self.assertContains(self.client.get('/search', {'w': 'kordojn'}), 'Plural, Accusative form of')
+
+        response = self.client.get('/word/kordojn')
+        self.assertContains(response, 'Plural, Accusative form of')
+        self.assertFalse(response.has_header('ETag'))
+        self.assertContains(response, 'href="/word/kordo"')
+        self.assertIsNone(pages.get_cache().get(pages.page_key('kordojn')))
+
+
+class TransliterationTestCase(DictionaryTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.language = Language.objects.create(name='Tokiponido')
+        glyph_set = GlyphSet.objects.create(name='Sitelen')
+        Orthography.objects.create(language=cls.language, font=Font.objects.create(name='Sitelen'), glyph_set=glyph_set)
+        for transcript, unicode in (('s', 'S'), ('sh', 'Ш'), ('shch', 'Щ'), ('a', 'А'), ('o', 'О'), ('k', 'К')):
+            Glyph.objects.create(glyph_set=glyph_set, name=transcript, transcript=transcript, unicode=unicode)
+
+        noun = WordClass.objects.create(name='Noun', abbr='n')
+        cls.word = Word.objects.create(language=cls.language, transcript='shchaka')
+        Word.objects.create(language=cls.language, transcript='kosa', unicode='typed')
+        entry = Entry.objects.create(word=cls.word, word_class=noun, paraphrase='Pike')
+        ExampleSentence.objects.create(entry=entry, transcript='Sha sosh!')
+        Inflection.objects.create(word=cls.word, transcript='shchakas')
+
+    def test_longest_match(self):
+        transliterate = Transliterator({'s': 'S', 'sh': 'Ш', 'shch': 'Щ', 'a': 'А'})
+
+        self.assertEqual(transliterate('shchash'), 'ЩАШ')
+        self.assertEqual(transliterate('Shcs shc'), 'ШcS Шc')
+        self.assertEqual(Transliterator({})('Shc'), 'shc')
+
+    def test_backfill(self):
+        version = self.word.version
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('transliterate_words', 'Tokiponido', batch_size=1, verbosity=0)
+
+        self.assertEqual(Word.objects.get(transcript='shchaka').unicode, 'ЩАКА')
+        self.assertEqual(Word.objects.get(transcript='kosa').unicode, 'typed')
+        self.assertEqual(Inflection.objects.get().unicode, 'ЩАКАS')
+        self.assertEqual(ExampleSentence.objects.get().unicode, 'ША SОШ!')
+        self.assertGreater(Word.objects.get(pk=self.word.pk).version, version)
+        self.assertEqual(cards.get_card('shchaka')['unicode'], 'ЩАКА')
+
+        call_command('transliterate_words', 'Tokiponido', overwrite=True, verbosity=0)
+        self.assertEqual(Word.objects.get(transcript='kosa').unicode, 'КОSА')
+
+
+    def test_backfill_on_other_database(self):
+        with temporary_database('other'):
+            language = Language.objects.using('other').create(name='Tokiponido')
+            word = Word.objects.using('other').create(language=language, transcript='kosa')
+            cards.refresh({word.pk}, using='other')
+            versions = dict(Word.objects.values_list('pk', 'version'))
+
+            with self.captureOnCommitCallbacks(using='other', execute=True):
+                for _ in UnicodeBackfill(Transliterator({'k': 'К'}), using='other').run(language):
+                    pass
+            self.assertEqual(Word.objects.using('other').get().unicode, 'Кosa')
+            self.assertEqual(Word.objects.using('other').get().version, word.version + 1)
+            self.assertFalse(WordCard.objects.using('other').exists())
+            self.assertEqual(dict(Word.objects.values_list('pk', 'version')), versions)
+
+
+class FontTestCase(DictionaryTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        subsets = self.settings(FONT_CACHE_DIR=os.path.join(self.directory, 'subsets'))
+        subsets.enable()
+        self.addCleanup(subsets.disable)
+
+        path = os.path.join(self.directory, 'sitelen.ttf')
+        if fonts.subsetting_available():
+            build_font(path, 'АКШЩ')
+        else:
+            with open(path, 'wb') as file:
+                file.write(b'font')
+        language = Language.objects.create(name='Tokiponido')
+        self.font = Font.objects.create(name='Sitelen', file=path)
+        Orthography.objects.create(language=language, font=self.font)
+        Word.objects.create(language=language, transcript='shchaka', unicode='ЩАКА')
+
+    def test_word_page_links_subset(self):
+        url = fonts.subset_url(self.font, 'АКЩ')
+        self.assertContains(self.client.get('/word/shchaka'), url)
+
+        response = self.client.get(url)
+        self.assertEqual(response['Cache-Control'], fonts.IMMUTABLE)
+
+        stale = url.replace(fonts.font_hash(self.font), '0' * 16)
+        self.assertRedirects(self.client.get(stale), url, fetch_redirect_response=False)
+        renamed = url.rsplit('.', 1)[0] + '.otf'
+        self.assertRedirects(self.client.get(renamed), url, fetch_redirect_response=False)
+
+        version, extension = fonts.font_hash(self.font), fonts.font_extension(self.font)
+        # Not UTF-8, and not signed
+        for token in (fonts.signer().sign('_w'), 'QUJD'):
+            malformed = reverse('font', args=(self.font.pk, version, token, extension))
+            self.assertEqual(self.client.get(malformed).status_code, 404)
+
+    @skipUnless(fonts.subsetting_available(), 'fontTools and brotli are not installed')
+    def test_subset_is_cached(self):
+        from fontTools.ttLib import TTFont
+
+        url = fonts.subset_url(self.font, 'АК')
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'font/woff2')
+        self.assertEqual(set(TTFont(BytesIO(response.content)).getBestCmap()), {ord('А'), ord('К')})
+        cached = os.listdir(os.path.join(self.directory, 'subsets'))
+        self.assertEqual(len(cached), 1)
+        self.assertTrue(cached[0].endswith('.woff2'))
+
+        with mock.patch.object(fonts, 'make_subset') as make_subset:
+            self.assertEqual(self.client.get(url).content, response.content)
+        make_subset.assert_not_called()
+
+    def test_whole_font_keeps_its_format(self):
+        with mock.patch.object(fonts, 'font_subset', None):
+            url = fonts.subset_url(self.font, 'АКЩ')
+            self.assertTrue(url.endswith('.ttf'), url)
+            self.assertContains(self.client.get('/word/shchaka'), "url('%s') format('truetype')" % url)
+            with open(self.font.file, 'rb') as file:
+                self.assertEqual(self.client.get(url).content, file.read())
+
+    def test_subset_cache_evicts_least_recently_used(self):
+        cache = fonts.SubsetCache(os.path.join(self.directory, 'subsets'), 10)
+        for age, key in enumerate('ab'):
+            cache.set(key, b'1234')
+            os.utime(cache.path(key), ns=(age, age))
+
+        self.assertEqual(cache.get('a'), b'1234')
+        cache.set('c', b'1234')
+        self.assertEqual([key for key in 'abc' if cache.get(key)], ['a', 'c'])
+
+
+class CatalogTestCase(DictionaryTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.noun = WordClass.objects.create(name='Noun', abbr='n')
+        cls.esperanto = Language.objects.create(name='Esperanto')
+        cls.ido = Language.objects.create(name='Ido')
+        for transcript in ('kordo', 'arko'):
+            word = Word.objects.create(language=cls.esperanto, transcript=transcript)
+            entry = Entry.objects.create(word=word, word_class=cls.noun, paraphrase=transcript)
+            ExampleSentence.objects.create(entry=entry, transcript='La %s' % transcript)
+        Word.objects.create(language=cls.ido, transcript='kordo')
+
+    def counts(self):
+        return {language['name']: (language['word_count'], language['entry_count'], language['example_count'])
+                for language in catalog.catalog()}
+
+    def test_counts_follow_changes(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.counts(), {'Esperanto': (2, 2, 2), 'Ido': (1, 0, 0)})
+
+        Word.objects.get(language=self.esperanto, transcript='arko').delete()
+        entry = Entry.objects.get()
+        entry.word = Word.objects.get(language=self.ido)
+        entry.save()
+        self.assertEqual(self.counts(), {'Esperanto': (1, 0, 0), 'Ido': (1, 1, 1)})
+
+        list(DictionaryImporter().run([formats.record('Esperanto', 'kordo', entries=[
+            {'class': 'Noun', 'paraphrase': 'Fadeno', 'examples': [{'transcript': 'Kordo'}]}
+        ]), formats.record('Volapük', 'kord')]))
+        self.assertEqual(self.counts(), {'Esperanto': (1, 1, 1), 'Ido': (1, 1, 1), 'Volapük': (1, 0, 0)})
+
+    def test_missing_counts_are_recounted(self):
+        LanguageStats.objects.all().delete()
+
+        self.assertEqual(self.counts(), {'Esperanto': (2, 2, 2), 'Ido': (1, 0, 0)})
+        self.assertContains(self.client.get('/library'), '2 entries')
+
+
+class ImportDictionaryTestCase(DictionaryTestCase):
+    record = {
+        'language': 'Esperanto',
+        'word': 'kordo',
+        'accents': ['ˈkordo'],
+        'entries': [{
+            'class': 'Noun', 'abbr': 'n', 'paraphrase': 'Fadeno el bestaj intestoj', 'tags': ['Muziko'],
+            'examples': [{'transcript': 'La arĉo kuradis sur la kordoj'}],
+        }],
+    }
+
+    def setUp(self):
+        super().setUp()
+        self.directory = TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def import_file(self, name, content, *args):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        call_command('import_dictionary', path, *args, verbosity=0)
+
+    def test_jsonl(self):
+        self.import_file('words.jsonl', json.dumps(self.record) + '\n')
+
+        word = Word.objects.get(transcript='kordo')
+        entry = word.entries.get()
+        self.assertEqual(word.language.name, 'Esperanto')
+        self.assertEqual(word.search_key, 'kordo')
+        self.assertEqual(word.accent_set.get().ipa, 'ˈkordo')
+        self.assertEqual(entry.word_class.abbr, 'n')
+        self.assertEqual([tag.name for tag in entry.tags.all()], ['Muziko'])
+        self.assertEqual(entry.examples.get().search_key, fold('La arĉo kuradis sur la kordoj'))
+        self.assertContains(self.client.get('/search', {'w': 'intestoj'}), 'kordo')
+
+    def test_reimport_is_idempotent(self):
+        self.import_file('words.jsonl', json.dumps(self.record) + '\n')
+        version = Word.objects.get().version
+        self.import_file('words.jsonl', json.dumps(self.record) + '\n')
+
+        self.assertEqual(Entry.objects.count(), 1)
+        self.assertEqual(Accent.objects.count(), 1)
+        self.assertEqual(Word.objects.get().version, version)
+
+    def test_csv(self):
+        self.import_file('words.csv', (
+            'word,class,paraphrase,tags,examples\n'
+            'kordo,Noun,Fadeno,Muziko;Anatomio,"Unu\nDu"\n'
+            'kordo,Verb,Kordi,,\n'
+        ), '--language', 'Esperanto')
+
+        word = Word.objects.get(transcript='kordo')
+        self.assertEqual(word.entries.count(), 2)
+        self.assertEqual(ExampleSentence.objects.count(), 2)
+        self.assertEqual(ObjectTag.objects.filter(model='Entry').count(), 2)
+
+    def test_tei(self):
+        self.import_file('words.xml', (
+            '<TEI xmlns="http://www.tei-c.org/ns/1.0"><text><body>'
+            '<entry><form type="lemma"><orth>kordo</orth><pron>ˈkordo</pron></form>'
+            '<gramGrp><pos>Noun</pos></gramGrp>'
+            '<sense><def>Fadeno</def><cit type="example"><quote>Unu kordo</quote></cit></sense></entry>'
+            '</body></text></TEI>'
+        ), '--language', 'Esperanto')
+
+        entry = Entry.objects.get(word__transcript='kordo')
+        self.assertEqual(entry.word_class.name, 'Noun')
+        self.assertEqual(entry.examples.get().transcript, 'Unu kordo')
+        self.assertEqual(Accent.objects.get().ipa, 'ˈkordo')
+
+    def test_generated_abbreviations_and_tags_are_unique(self):
+        WordClass.objects.create(name='Substantivo', abbr='Substantiv')
+        entries = [
+            {'class': name, 'paraphrase': name, 'tags': ['Muziko', 'Muziko']}
+            for name in ('Substantivo propra', 'Substantivo komuna')
+        ]
+        self.import_file('words.jsonl', json.dumps(dict(self.record, entries=entries)) + '\n')
+
+        self.assertEqual(
+            sorted(WordClass.objects.values_list('abbr', flat=True)), ['Substanti2', 'Substanti3', 'Substantiv']
+        )
+        self.assertEqual(Entry.tags.through.objects.count(), 2)
+
+    def test_new_words_invalidate_searches(self):
+        etag = self.client.get('/search', {'w': 'kordo'})['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.import_file('words.jsonl', json.dumps(self.record) + '\n')
+        self.assertEqual(self.client.get('/search', {'w': 'kordo'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_entries_need_class_and_paraphrase(self):
+        errors = StringIO()
+        path = os.path.join(self.directory.name, 'words.xml')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(
+                '<TEI xmlns="http://www.tei-c.org/ns/1.0"><text><body>'
+                '<entry><form type="lemma"><orth>kordo</orth></form><sense><def>Fadeno</def></sense></entry>'
+                '</body></text></TEI>'
+            )
+        call_command('import_dictionary', path, '--language', 'Esperanto', stdout=StringIO(), stderr=errors)
+
+        self.assertIn("An entry of word 'kordo' has no word class.", errors.getvalue())
+        self.assertFalse(WordClass.objects.exists())
+        with self.assertRaises(formats.FormatError):
+            formats.record('Esperanto', 'kordo', entries=[{'class': 'Noun', 'paraphrase': ''}])
+
+    def test_existing_word_page_is_invalidated(self):
+        language = Language.objects.create(name='Esperanto')
+        word = Word.objects.create(language=language, transcript='kordo')
+        self.client.get('/word/kordo')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.import_file('words.jsonl', json.dumps(self.record) + '\n')
+        self.assertContains(self.client.get('/word/kordo'), 'Fadeno el bestaj intestoj')
+        self.assertEqual(Word.objects.get(pk=word.pk).version, word.version + 1)
+
+
+class ExportDictionaryTestCase(DictionaryTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.language = Language.objects.create(name='Esperanto')
+        noun = WordClass.objects.create(name='Noun', abbr='n')
+        cls.word = Word.objects.create(language=cls.language, transcript='kordo')
+        Accent.objects.create(word=cls.word, ipa='ˈkordo')
+        entry = Entry.objects.create(word=cls.word, word_class=noun, paraphrase='Fadeno')
+        entry.tags.add(ObjectTag.objects.create(model='Entry', name='Muziko'))
+        ExampleSentence.objects.create(entry=entry, transcript='Unu kordo')
+        plural = InflectionTag.objects.create(clss=InflectionClass.objects.create(name='Noun'), name='Plural')
+        Inflection.objects.create(word=cls.word, transcript='kordoj').tags.add(plural)
+        Word.objects.create(language=cls.language, transcript='arĉo')
+
+    def export(self, *args):
+        output = StringIO()
+        call_command('export_dictionary', 'Esperanto', *args, stdout=output, stderr=StringIO())
+        return output.getvalue()
+
+    def test_jsonl(self):
+        records = [json.loads(line) for line in self.export().splitlines()]
+
+        self.assertEqual([item['word'] for item in records], ['kordo', 'arĉo'])
+        self.assertEqual(records[0]['accents'], ['ˈkordo'])
+        self.assertEqual(records[0]['entries'][0]['tags'], ['Muziko'])
+        self.assertEqual(records[0]['entries'][0]['examples'][0]['transcript'], 'Unu kordo')
+        self.assertEqual(records[0]['inflections'], [{'transcript': 'kordoj', 'unicode': '', 'tags': ['Plural']}])
+
+    def test_chunk_queries_do_not_grow_with_words(self):
+        with CaptureQueriesContext(connection) as before:
+            self.export()
+
+        entry = Entry.objects.get()
+        for index in range(20):
+            word = Word.objects.create(language=self.language, transcript='kordo%s' % index)
+            copy = Entry.objects.create(word=word, word_class=entry.word_class, paraphrase='Fadeno')
+            ExampleSentence.objects.create(entry=copy, transcript='Unu kordo')
+
+        with CaptureQueriesContext(connection) as after:
+            self.assertEqual(len(self.export().splitlines()), 22)
+        self.assertEqual(len(after), len(before))
+
+    def test_since(self):
+        Word.objects.filter(pk=self.word.pk).update(modified=now() - timedelta(days=2))
+        records = self.export('--since', (now() - timedelta(days=1)).date().isoformat())
+        self.assertEqual([json.loads(line)['word'] for line in records.splitlines()], ['arĉo'])
+
+    def test_formats_round_trip(self):
+        for file_format in ('jsonl', 'csv', 'tei'):
+            with self.subTest(file_format):
+                exported = self.export('--format', file_format)
+                records = list(formats.readers[file_format](
+                    BytesIO(exported.encode()) if file_format == 'tei' else StringIO(exported), 'Esperanto'
+                ))
+                self.assertEqual([item['word'] for item in records], ['kordo', 'arĉo'])
+                self.assertEqual(records[0]['entries'][0]['paraphrase'], 'Fadeno')
+                # CSV files carry neither accents nor inflections
+                if file_format != 'csv':
+                    self.assertEqual(records[0]['accents'], ['ˈkordo'])
+                    self.assertEqual(
+                        records[0]['inflections'], [{'transcript': 'kordoj', 'unicode': '', 'tags': ['Plural']}]
+                    )
+
+    def test_import_round_trip(self):
+        records = [json.loads(line) for line in self.export().splitlines()]
+        Word.objects.all().delete()
+        InflectionTag.objects.all().delete()
+
+        list(DictionaryImporter().run(records))
+        self.assertEqual(Accent.objects.get().ipa, 'ˈkordo')
+        inflection = Inflection.objects.get()
+        self.assertEqual((inflection.word.transcript, inflection.transcript), ('kordo', 'kordoj'))
+        tag = inflection.tags.get()
+        self.assertEqual((tag.clss.name, tag.name), (DictionaryImporter.IMPORTED_CLASS, 'Plural'))
+
+    def test_endpoint_streams(self):
+        response = self.client.get('/library/Esperanto/export', {'format': 'tei'})
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/tei+xml; charset=utf-8')
+        self.assertIn('<orth>kordoj</orth>', b''.join(response.streaming_content).decode())
+        self.assertEqual(self.client.get('/library/Esperanto/export', {'format': 'pdf'}).status_code, 400)
+
+
+class PresetTestCase(DictionaryTestCase):
+    def test_apply_preset(self):
+        call_command('makepresets', 'Esperanto', stdout=StringIO())
+
+        language = Language.objects.get(name='Esperanto')
+        self.assertEqual(language.transliteration['cx'], 'ĉ')
+        self.assertEqual(Entry.objects.filter(word__transcript='polvo').count(), 4)
+        self.assertEqual(AppliedPreset.objects.get().code, 'epo')
+
+    def test_applied_preset_is_skipped(self):
+        call_command('makepresets', 'epo', stdout=StringIO())
+        entries = Entry.objects.count()
+
+        output = StringIO()
+        with self.assertRaises(SystemExit):
+            call_command('makepresets', 'epo', stdout=output)
+        self.assertIn('already applied', output.getvalue())
+        self.assertEqual(Entry.objects.count(), entries)
+
+    def test_changed_preset_is_upgraded(self):
+        with TemporaryDirectory() as directory, override_settings(PRESET_DIRS=[directory]):
+            path = os.path.join(directory, 'tst.json')
+            preset = {'code': 'tst', 'version': 1, 'language': {'name': 'Test'}, 'words': [
+                {'word': 'unu', 'entries': [{'class': 'Noun', 'abbr': 'n', 'paraphrase': 'One'}]}
+            ]}
+            with open(path, 'w') as file:
+                json.dump(preset, file)
+            call_command('makepresets', 'tst', stdout=StringIO())
+
+            preset['version'] = 2
+            preset['words'].append({'word': 'du', 'entries': [{'class': 'Noun', 'paraphrase': 'Two'}]})
+            with open(path, 'w') as file:
+                json.dump(preset, file)
+            call_command('makepresets', 'tst', stdout=StringIO())
+
+        self.assertEqual(list(Word.objects.order_by('pk').values_list('transcript', flat=True)), ['unu', 'du'])
+        self.assertEqual(AppliedPreset.objects.get(code='tst').version, 2)
+
+
+@override_settings(SERVER_TIMING=True)
+class MetricsTestCase(DictionaryTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        language = Language.objects.create(name='Esperanto')
+        Word.objects.create(language=language, transcript='kordo')
+
+    def setUp(self):
+        super().setUp()
+        metrics.registry.reset()
+
+    def test_server_timing(self):
+        timing = self.client.get('/word/kordo')['Server-Timing']
+
+        self.assertRegex(timing, r'^db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+, total;dur=[\d.]+$')
+        self.assertNotEqual(re.search(r'tpl;dur=([\d.]+)', timing).group(1), '0.0')
+
+    def test_prometheus_endpoint(self):
+        self.client.get('/word/kordo')
+        self.client.get('/word/kordo')
+        exposition = self.client.get('/metrics', REMOTE_ADDR='127.0.0.1').content.decode()
+
+        self.assertIn('dictator_request_seconds_count{view="word"} 2', exposition)
+        self.assertRegex(exposition, r'dictator_db_queries_sum\{view="word"\} [1-9]')
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.1').status_code, 404)
+
+    @override_settings(VIEW_BUDGETS={'word': {'queries': 0}})
+    def test_budget_warning(self):
+        with self.assertLogs('app.middleware.metrics', 'WARNING') as logs:
+            self.client.get('/word/kordo')
+
+        self.assertIn("View 'word' over budget", logs.output[0])
+        self.assertIn('"app_word"', logs.output[0])
+        self.assertIn('dictator_budget_exceeded_total{view="word"} 1', metrics.registry.exposition())
+
+
+class TeleportTestCase(TestCase):
+    def render(self, source, **context):
+        return engines['django'].from_string('{% load teleport %}' + source).render(context)
+
+    def test_teleport(self):
+        source = "{% teleport full ? 'side' %}<b>{{ text }}</b>{% endteleport %}[{% portal 'side' %}]"
+        self.assertEqual(self.render(source, full=True, text='{x} & y'), '[<b>{x} &amp; y</b>]')
+        self.assertEqual(self.render(source, full=False, text='z'), '<b>z</b>[]')
+
+    def test_fragments_keep_their_context(self):
+        source = "{% for i in items %}{% teleport 'side' %}{{ i }}{% endteleport %}{% endfor %}{% portal 'side' %}"
+        self.assertEqual(self.render(source, items=[1, 2, 3]), '123')
+
+
+class BenchmarkTestCase(DictionaryTestCase):
+    def test_generated_lexicon(self):
+        counts = generator.generate('Synthetic', 30, entries=2, examples=3, tags=4)
+
+        self.assertEqual((counts['words'], counts['Entries'], counts['example sentences']), (30, 60, 180))
+        self.assertEqual(ObjectTag.objects.filter(model='Entry').count(), 4)
+        self.assertEqual(
+            [item['word'] for item in generator.records('Synthetic', 30)],
+            list(Word.objects.order_by('pk').values_list('transcript', flat=True))
+        )
+
+    def test_run_and_compare(self):
+        results = benchmark_suite.run(20, repeat=2, names=['search', 'word_page'])
+        self.assertEqual(set(results['results']), {'search', 'word_page'})
+        self.assertEqual(results['results']['search']['runs'], 2)
+
+        slower = json.loads(json.dumps(results))
+        slower['results']['search']['median'] *= 2
+        _, regressions = benchmark_suite.compare(results, slower)
+        self.assertEqual(regressions, ['search'])
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Query plans are checked with SQLite.')
+class QueryPlanTestCase(DictionaryTestCase):
+    """
+    Run the hot lookups and fail if SQLite plans a full scan of any table.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.language = Language.objects.create(name='Esperanto')
+        cls.word_class = WordClass.objects.create(name='Noun', abbr='n')
+        cls.word = Word.objects.create(language=cls.language, transcript='kordo')
+        cls.entry = Entry.objects.create(word=cls.word, word_class=cls.word_class, paraphrase='Fadeno')
+        ExampleSentence.objects.create(entry=cls.entry, transcript='Unu kordo')
+        ObjectTag.objects.create(model='Entry', name='Muziko')
+
+    def full_scans(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = [row[-1] for row in cursor.fetchall()]
+        return [step for step in plan if step.startswith('SCAN ') and 'VIRTUAL TABLE' not in step]
+
+    def assertNoFullScans(self, operation):
+        with CaptureQueriesContext(connection) as context:
+            operation()
+
+        selects = [query['sql'] for query in context.captured_queries if query['sql'].startswith('SELECT')]
+        self.assertTrue(selects)
+        for sql in selects:
+            self.assertEqual(self.full_scans(sql), [], sql)
+
+    def test_word_page(self):
+        self.assertNoFullScans(lambda: self.client.get('/word/kordo'))
+        # Warm the cached transliteration rules, which are read by a scan.
+        language_rules()
+        self.assertNoFullScans(lambda: self.client.get('/word/KORDO'))
+
+    def test_search(self):
+        # Warm the cached transliteration rules, which are read by a scan.
+        search('kordo')
+        self.assertNoFullScans(lambda: search('kordo'))
+        self.assertNoFullScans(lambda: search('fadeno', Cursor(0, ENTRY, self.entry.pk, 20)))
+        self.assertNoFullScans(lambda: find_forms('kordoj'))
+
+    def test_import_lookups(self):
+        self.assertNoFullScans(lambda: list(DictionaryImporter().run([formats.record('Esperanto', 'kordo', entries=[
+            {'class': 'Noun', 'paraphrase': 'Fadeno', 'tags': ['Muziko']}
+        ], accents=['ˈkordo'])])))
+
+    def test_export_chunks(self):
+        self.assertNoFullScans(lambda: list(export_words(self.language)))
+
+    def test_signal_lookups(self):
+        self.assertNoFullScans(lambda: self.entry.save())
+        self.assertNoFullScans(lambda: self.word_class.save())
+
+
+class ApplicationStateTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        AppConfig.application_expires = 0
+
+    def test_missing_application_is_cached(self):
+        with self.assertNumQueries(1):
+            self.assertIsNone(AppConfig.get_application())
+            self.assertIsNone(AppConfig.get_application())
+
+        AppConfig.application_expires = 0
+        with self.assertNumQueries(0):
+            self.assertIsNone(AppConfig.get_application())
+
+    def test_failed_query_is_not_shared(self):
+        application = Application.objects.create(name='dictator')
+        AppConfig.update()
+        cache.clear()
+        AppConfig.application_expires = 0
+
+        with mock.patch.object(Application.objects, 'first', side_effect=DatabaseError('gone')):
+            with self.assertLogs('app', 'WARNING'):
+                self.assertEqual(AppConfig.get_application(), application)
+        self.assertIsNone(cache.get(AppConfig.application_key))
+
+    def test_signals_refresh_status(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            application = Application.objects.create(name='dictator')
+        with self.assertNumQueries(0):
+            self.assertEqual(AppConfig.get_application(), application)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            application.delete()
+        self.assertIsNone(AppConfig.get_application())
+
+    def test_setup_page(self):
+        self.assertContains(self.client.get('/'), 'Application is not yet initialized.')
@@ -1,7 +1,22 @@
-from django.shortcuts import render, redirect
-from watson import search as watson
+import json
 
-from app.models import Word, Language, Entry, ExampleSentence
+from django.conf import settings
+from django.db import router
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render, redirect
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from app.middleware.compression import compress_page
+from app.models import Font, Language, Word
+from app.services import cards, catalog, fonts, fuzzy, pages, search as search_service, suggest as suggest_service
+from app.services import metrics as metrics_service, normalization
+from app.services.aio import database
+from app.services.exporter import export_words, watermark
+from app.services.formats import CONTENT_TYPES, EXTENSIONS, writers
+from app.services.search import Cursor
 
 
 def index(request):
@@ -11,35 +26,242 @@ def index(request):
     })
 
 
-def search(request):
+async def search(request):
     val = request.GET.get('w', '').strip()
 
     if len(val) == 0:
         return redirect('index')
 
-    words = Word.objects.filter(transcript__icontains=val)
-    entries = Entry.objects.filter(paraphrase__icontains=val).exclude(word_id__in=words)
-    sentences = ExampleSentence.objects.filter(transcript__icontains=val).exclude(entry__word_id__in=words)
+    etag = pages.search_etag(request)
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+
+    cursor = Cursor.decode(request.GET.get('c', ''))
+    page = await search_service.asearch(val, cursor)
+    # Words the value is an inflected form of lead the first page.
+    forms = await database(search_service.find_forms)(val) if cursor is None else []
+    results = {'words': [], 'entries': [], 'sentences': []}
+
+    for result in page.results:
+        results[('words', 'entries', 'sentences')[result['kind']]].append(result)
 
-    return render(request, 'search.html', {
+    pks = list(dict.fromkeys([form.word for form in forms] + [r['key'] for r in results['words']]))
+    words = await database(cards.get_cards)(pks)
+    # Words deleted since they matched have no card.
+    results['words'] = [words[pk] for pk in pks if pk in words]
+
+    response = render(request, 'search.html', {
         'search_value': val,
-        'results': {
-            'words': watson.filter(words, val),
-            'entries': watson.filter(entries, val),
-            'sentences': watson.filter(sentences, val)
-        }
+        'forms': forms,
+        'results': results,
+        'next_cursor': page.next_cursor and page.next_cursor.encode(),
+        'did_you_mean': await database(did_you_mean)(val) if not page.results and not forms else [],
+    })
+    response['ETag'] = etag
+    return response
+
+
+async def suggest(request):
+    val = request.GET.get('q', '').strip()
+    languages = None
+
+    if 'lang' in request.GET:
+        languages = await database(language_ids)(request.GET['lang'])
+
+    suggestions = []
+    if val and suggest_service.indexes.ready():
+        # Built indexes answer from memory, right on the event loop.
+        suggestions = suggest_service.suggest(val, languages, settings.SUGGEST_LIMIT)
+    elif val:
+        suggestions = await database(suggest_service.suggest)(val, languages, settings.SUGGEST_LIMIT)
+
+    return JsonResponse({
+        'query': val,
+        'suggestions': [
+            {'transcript': transcript, 'url': reverse('word', args=(transcript,))}
+            for _, transcript in suggestions
+        ],
     })
 
 
+def language_ids(name):
+    return set(Language.objects.filter(name=name).values_list('pk', flat=True))
+
+
 def library(request):
-    lang = Language.objects.all()
-    return render(request, 'library.html')
+    return render(request, 'library.html', {
+        'languages': catalog.catalog(),
+    })
+
+
+def export(request, name):
+    language = get_object_or_404(Language, name=name)
+    file_format = request.GET.get('format', 'jsonl')
+    since = None
+
+    if file_format not in writers:
+        return HttpResponseBadRequest("Unknown format '%s'." % file_format)
+    if 'since' in request.GET:
+        try:
+            since = watermark(request.GET['since'])
+        except ValueError as ex:
+            return HttpResponseBadRequest(str(ex))
+
+    # The response streams after the request is routed, so pick the
+    # database now.
+    words = export_words(language, since, using=router.db_for_read(Word))
+    response = StreamingHttpResponse(
+        writers[file_format](words, language.name),
+        content_type='%s; charset=utf-8' % CONTENT_TYPES[file_format],
+    )
+    response['Content-Disposition'] = 'attachment; filename="%s.%s"' % (language.name, EXTENSIONS[file_format])
+    return response
+
+
+@csrf_exempt
+@require_http_methods(['GET', 'POST'])
+@compress_page
+def api_words(request):
+    """
+    Look up a batch of words by transcript.
+
+    Transcripts are given as repeated `w` parameters, optionally with a
+    `lang` to look in, or POSTed as JSON: {"words": [...], "language": ...}.
+    All of them are resolved in a single query.
+    """
+    if request.method == 'POST':
+        try:
+            body = json.loads(request.body)
+            names, language = body['words'], body.get('language')
+        except (ValueError, KeyError, TypeError):
+            return api_error('Expected a JSON object with a list of words.')
+    else:
+        names, language = request.GET.getlist('w'), request.GET.get('lang')
 
+    if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+        return api_error('Words must be a list of strings.')
+    names = list(dict.fromkeys(name.strip() for name in names if name.strip()))
+    if len(names) > settings.API_BATCH_LIMIT:
+        return api_error('At most %s words can be looked up at once.' % settings.API_BATCH_LIMIT)
 
-def word(request, name):
-    word_object = Word.objects.get(transcript=name)
+    resolved = cards.resolve(names, language)
+    return JsonResponse({
+        'words': {
+            name: [api_word(language_name, document) for language_name, document in resolved[name]]
+            for name in names if name in resolved
+        },
+        'missing': [name for name in names if name not in resolved],
+    }, json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')})
+
+
+def api_word(language, document):
+    return {
+        'language': language,
+        'transcript': document['transcript'],
+        'unicode': document['unicode'],
+        'accents': [accent['ipa'] for accent in document['accents']],
+        'entries': [
+            {
+                'class': group['grouper']['name'],
+                'paraphrase': entry['paraphrase'],
+                'note': entry['note'],
+                'tags': [tag['name'] for tag in entry['tags']],
+                'examples': entry['examples'],
+            } for group in document['entry_groups'] for entry in group['list']
+        ],
+        'inflections': [
+            {**inflection, 'tags': [tag['name'] for tag in inflection['tags']]}
+            for inflection in document['inflections']
+        ],
+    }
+
+
+def api_error(message):
+    return JsonResponse({'error': message}, status=400)
+
+
+def metrics(request):
+    if request.META.get('REMOTE_ADDR') not in settings.INTERNAL_IPS:
+        raise Http404
+    return HttpResponse(metrics_service.registry.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def did_you_mean(val):
+    return [transcript for _, transcript in fuzzy.did_you_mean(val)]
+
+
+def find_transcript(name):
+    """
+    Return the transcript of a word matching the name case-insensitively.
+
+    Words are looked up by search key, which is case-folded in any script,
+    and their transcripts compared with the name case-folded alike.
+    """
+    name = normalization.normalize(name)
+    found = Word.objects.filter(search_key__in=normalization.query_keys(name)).order_by('pk')
+    return next((
+        transcript for transcript in found.values_list('transcript', flat=True)
+        if normalization.normalize(transcript) == name
+    ), None)
+
+
+async def word(request, name):
+    # Cached pages are served without leaving the event loop.
+    response = pages.cached_response(request, name)
+    if response is None:
+        response = await database(pages.cached_page)(request, name, lambda: render_word(request, name))
+    return response
+
+
+def render_word(request, name):
+    try:
+        word_object = cards.get_card(name)
+    except Word.DoesNotExist:
+        canonical = find_transcript(name)
+        if canonical is not None:
+            return redirect('word', canonical)
+        forms = search_service.find_forms(name)
+        if forms:
+            words = cards.get_cards([form.word for form in forms])
+            return render(request, 'dictionary/word_forms.html', {
+                'search_value': name,
+                'forms': forms,
+                'words': list({form.word: words[form.word] for form in forms if form.word in words}.values()),
+            })
+        return render(request, 'dictionary/word_not_found.html', {
+            'search_value': name,
+            'did_you_mean': did_you_mean(name),
+        }, status=404)
 
     return render(request, 'dictionary/word.html', {
         'search_value': name,
         'word': word_object,
+        'font_faces': fonts.font_faces(
+            Word.objects.filter(transcript=name).values('language'), *fonts.card_texts(word_object)
+        ),
     })
+
+
+def font(request, pk, version, text, extension):
+    """
+    Serve the subset of a font holding the characters encoded in the URL.
+
+    URLs of an older version of the font file, or with another extension,
+    redirect to the current one.
+    """
+    font_object = get_object_or_404(Font, pk=pk)
+    text = fonts.decode_text(text)
+    if text is None:
+        raise Http404('Malformed font subset.')
+
+    try:
+        if version != fonts.font_hash(font_object) or extension != fonts.font_extension(font_object):
+            return redirect(fonts.subset_url(font_object, text))
+        content, content_type = fonts.subset(font_object, text)
+    except fonts.FontError as ex:
+        raise Http404(str(ex))
+
+    response = HttpResponse(content, content_type=content_type)
+    response['Cache-Control'] = fonts.IMMUTABLE
+    return response
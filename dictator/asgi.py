@@ -5,12 +5,37 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
+
+Deployment profile
+------------------
+Search, word pages and suggestions are async views, and every middleware
+is async-capable, so under an ASGI server a request only leaves the event
+loop for database work. Cached word pages and suggestions from built
+indexes are answered on the loop itself. For many concurrent clients on a
+small box, run one worker per core::
+
+    uvicorn dictator.asgi:application --workers 2 --loop uvloop --http httptools
+
+or under gunicorn::
+
+    gunicorn dictator.asgi:application -k uvicorn.workers.UvicornWorker -w 2
+
+With ASYNC_PARALLEL_QUERIES (the default), the three queries of a search
+run concurrently in worker threads, each holding its own connection. Size
+the database's connection limit for about three connections per in-flight
+search, and set CONN_MAX_AGE to keep those connections open between
+requests. Use a cache shared by the workers (e.g. memcached or Redis)
+instead of the per-process default, so page invalidations reach them all.
 """
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dictator.settings')
+django.setup(set_prefix=False)
+
+# Streams responses from sync code, unlike get_asgi_application()'s handler.
+from app.services.aio import ASGIHandler  # noqa: E402
 
-application = get_asgi_application()
+application = ASGIHandler()
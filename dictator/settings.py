@@ -37,11 +37,12 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'watson',
     'app',
 ]
 
 MIDDLEWARE = [
+    'app.middleware.metrics.MetricsMiddleware',
+    'app.middleware.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -49,7 +50,6 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'watson.middleware.SearchContextMiddleware',
     'app.middleware.site.InstallationMiddleware',
 ]
 
@@ -57,7 +57,9 @@ ROOT_URLCONF = 'dictator.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Django templates, with render times recorded for MetricsMiddleware
+        'BACKEND': 'app.services.metrics.TimedDjangoTemplates',
+        'NAME': 'django',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -76,11 +78,61 @@ WSGI_APPLICATION = 'dictator.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
+#
+# DICTATOR_DATABASE picks a profile:
+#
+# - 'sqlite' (default): a single SQLite file.
+# - 'postgres': PostgreSQL with persistent connections, kept open for
+#   CONN_MAX_AGE seconds instead of connecting on every request.
+# - 'pgbouncer': PostgreSQL behind an external pooler in transaction mode.
+#   The pooler keeps the server connections, so Django's are closed after
+#   each request, and server-side cursors, which cannot outlive a pooled
+#   transaction, are disabled.
+#
+# PostgreSQL is reached through DICTATOR_DATABASE_HOST, _PORT, _NAME, _USER and
+# _PASSWORD. DICTATOR_DATABASE_REPLICAS lists the hosts of read replicas,
+# separated by commas; they get the aliases 'replica1', 'replica2' and so on.
+
+DATABASE_PROFILE = os.environ.get('DICTATOR_DATABASE', 'sqlite')
+
+if DATABASE_PROFILE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'HOST': os.environ.get('DICTATOR_DATABASE_HOST', 'localhost'),
+            'PORT': os.environ.get('DICTATOR_DATABASE_PORT', ''),
+            'NAME': os.environ.get('DICTATOR_DATABASE_NAME', 'dictator'),
+            'USER': os.environ.get('DICTATOR_DATABASE_USER', 'dictator'),
+            'PASSWORD': os.environ.get('DICTATOR_DATABASE_PASSWORD', ''),
+            'CONN_MAX_AGE': 0 if DATABASE_PROFILE == 'pgbouncer' else 600,
+            'DISABLE_SERVER_SIDE_CURSORS': DATABASE_PROFILE == 'pgbouncer',
+        }
+    }
+    for number, host in enumerate(filter(None, os.environ.get('DICTATOR_DATABASE_REPLICAS', '').split(',')), 1):
+        DATABASES['replica%s' % number] = dict(
+            DATABASES['default'], HOST=host.strip(), TEST={'MIRROR': 'default'}
+        )
+
+DATABASE_ROUTERS = ['app.services.replicas.ReplicaRouter']
+
 
-DATABASES = {
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+#
+# Word pages are cached in full. With several worker processes, point this at
+# a shared backend (e.g. FileBasedCache or Memcached) so invalidations reach
+# every worker.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
@@ -130,3 +182,59 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Application
 
 NODE_DIR = BASE_DIR / 'app' / 'jstoolchains'
+
+# Search results served per page, and overall across all pages of a search
+SEARCH_PAGE_SIZE = 20
+SEARCH_RESULT_LIMIT = 200
+
+# Autocomplete suggestions served per query
+SUGGEST_LIMIT = 10
+
+# Cache alias and timeout (in seconds) of rendered word pages
+WORD_PAGE_CACHE = 'default'
+WORD_PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Seconds the application status is trusted before checking it again
+APPLICATION_STATE_TTL = 60
+
+# Directories searched for language preset files (see app/services/presets.py)
+PRESET_DIRS = [BASE_DIR / 'app' / 'presets']
+
+# Send per-request timings (database, templates, total) in Server-Timing headers
+SERVER_TIMING = DEBUG
+
+# Clients allowed to read the Prometheus metrics at /metrics
+INTERNAL_IPS = ['127.0.0.1']
+
+# Per-view budgets of SQL queries and total milliseconds; requests over
+# budget are logged as warnings along with the SQL they ran
+VIEW_BUDGETS = {
+    'search': {'queries': 8, 'ms': 200},
+    'word': {'queries': 4, 'ms': 100},
+    'library': {'queries': 4, 'ms': 100},
+    'api-words': {'queries': 4, 'ms': 200},
+}
+
+# Run independent queries of async views (such as the three parts of a search)
+# concurrently in worker threads, each with its own database connection.
+# Needs a database accepting concurrent connections; tests turn it off, as
+# their data only lives in the transaction of the test's connection.
+ASYNC_PARALLEL_QUERIES = True
+
+# Read replicas (database aliases) serving the views in REPLICA_VIEWS, and the
+# seconds they may lag behind the primary. For that long after writing, a
+# client reads from the primary, and changed word pages are not cached.
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith('replica')]
+REPLICA_VIEWS = ['search', 'word', 'export', 'api-words']
+REPLICA_LAG = 5
+
+# Transcripts looked up at most by a single request to the words API
+API_BATCH_LIMIT = 500
+
+# Directory of the font subsets linked from word pages, and the bytes it may
+# hold before the least recently used subsets are evicted
+FONT_CACHE_DIR = BASE_DIR / 'fontcache'
+FONT_CACHE_SIZE = 64 * 1024 * 1024
+
+# Characters a single font subset may hold
+FONT_SUBSET_MAX_CHARS = 1024
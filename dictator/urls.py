@@ -22,7 +22,13 @@ urlpatterns = [
     # web
     path('', views.index, name='index'),
     path('search', views.search, name='search'),
+    path('suggest', views.suggest, name='suggest'),
     path('library', views.library, name='library'),
+    path('library/<name>/export', views.export, name='export'),
     path('word/<name>', views.word, name='word'),
+    path('fonts/<int:pk>/<version>/<text>.<slug:extension>', views.font, name='font'),
+    path('metrics', views.metrics, name='metrics'),
+    # api
+    path('api/v1/words', views.api_words, name='api-words'),
     path('admin/', admin.site.urls),
 ]